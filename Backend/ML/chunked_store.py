@@ -0,0 +1,374 @@
+"""
+Out-of-core ingestion of datasets larger than memory.
+
+`ingest_csv` streams the CSV in fixed-size chunks, twice:
+
+1. Every chunk is passed through `derive_features`, and exact value counts
+   are accumulated: the global economic values and each numeric feature per
+   `water_type`. From these, `FeatureStatistics.to_transformer` builds a
+   `FeatureTransformer` identical to one fitted on the whole frame. Ranks and
+   medians are exact, not approximate.
+2. Every chunk is transformed with it and its rows are appended to one
+   partition per (state, river_name). A uniform sample of rows is kept for
+   training.
+
+The partitions are then compacted to one Parquet file each, one partition at
+a time. `PartitionedStore` reads a partition only when a query asks for it.
+Memory is bounded by the chunk size (and by the largest partition during
+compaction and queries) plus the value counts, never by the full dataset.
+
+    python -m ML.chunked_store --data-path archive.csv --out archive_store --train
+
+Requires pyarrow.
+"""
+
+import argparse
+import json
+import shutil
+import sys
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ML.fish_advisory_pipeline import (
+    FEATURE_COLUMNS,
+    NUMERIC_FEATURES,
+    FeatureTransformer,
+    build_preprocessor,
+    derive_features,
+    generate_heatmap_points,
+    iter_advisories_for_state,
+    train_zone_classifier,
+)
+from ML.model_store import (
+    data_fingerprint,
+    load_feature_transformer,
+    save_feature_transformer,
+    save_model,
+)
+
+
+STORE_MANIFEST = "manifest.json"
+STORE_VERSION = 1
+TRAINING_SAMPLE_FILENAME = "training_sample.parquet"
+
+_ECON_COL = "economic_value_in_INR_per_kg"
+
+
+def _require_pyarrow() -> None:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise ImportError("The partitioned store requires pyarrow (pip install pyarrow)") from e
+
+
+def _add_counts(total: Optional[pd.Series], counts: pd.Series) -> pd.Series:
+    if total is None:
+        return counts.astype(np.int64)
+    return total.add(counts, fill_value=0).astype(np.int64)
+
+
+def _median_pair(values: np.ndarray, counts: np.ndarray) -> Tuple[float, float]:
+    """The two middle values of a sorted multiset (equal when its size is odd)."""
+    cum = np.cumsum(counts)
+    total = int(cum[-1])
+    lower = values[np.searchsorted(cum, (total - 1) // 2, side="right")]
+    upper = values[np.searchsorted(cum, total // 2, side="right")]
+    return float(lower), float(upper)
+
+
+class FeatureStatistics:
+    """Exact value counts for the dataset-wide features, merged chunk by chunk."""
+
+    def __init__(self):
+        self.n_rows = 0
+        self.econ_counts: Optional[pd.Series] = None
+        # column -> counts indexed by (water_type, value)
+        self.group_counts: Dict[str, Optional[pd.Series]] = {
+            col: None for col in NUMERIC_FEATURES if col != "economic_priority_score"
+        }
+        # The priority score is a monotone function of the economic value, so
+        # its per-group median follows from the economic value counts
+        self.group_counts[_ECON_COL] = None
+
+    def update(self, derived: pd.DataFrame) -> None:
+        """Add one chunk that has been through `derive_features`."""
+        self.n_rows += len(derived)
+        self.econ_counts = _add_counts(
+            self.econ_counts, derived[_ECON_COL].astype(np.float64).value_counts()
+        )
+        water_type = derived["water_type"].astype(object)
+        for col in self.group_counts:
+            counts = (
+                pd.DataFrame({"water_type": water_type, "value": derived[col].astype(np.float64)})
+                .dropna()
+                .value_counts()
+            )
+            self.group_counts[col] = _add_counts(self.group_counts[col], counts)
+
+    def to_transformer(self) -> FeatureTransformer:
+        """A `FeatureTransformer` equal to one fitted on all chunks at once."""
+        econ = self.econ_counts.sort_index()
+        transformer = FeatureTransformer()
+        transformer.n_rows_ = self.n_rows
+        transformer.econ_values_ = econ.index.to_numpy(dtype=np.float64)
+        transformer.econ_cum_counts_ = np.cumsum(econ.to_numpy(dtype=np.int64))
+
+        medians: Dict[str, Dict[Any, float]] = {col: {} for col in NUMERIC_FEATURES}
+        for col, counts in self.group_counts.items():
+            if counts is None or counts.empty:
+                continue
+            for water_type, group in counts.groupby(level=0, sort=False):
+                group = group.droplevel(0).sort_index()
+                lower, upper = _median_pair(group.index.to_numpy(), group.to_numpy())
+                if col == _ECON_COL:
+                    lower, upper = transformer._econ_score(np.array([lower, upper]))
+                    medians["economic_priority_score"][water_type] = (lower + upper) / 2
+                else:
+                    medians[col][water_type] = (lower + upper) / 2
+
+        groups = sorted({g for col in medians.values() for g in col})
+        transformer.medians_ = pd.DataFrame(
+            {col: [medians[col].get(g, np.nan) for g in groups] for col in NUMERIC_FEATURES},
+            index=pd.Index(groups, dtype=object, name="water_type"),
+        )
+        return transformer
+
+
+def _pair_keys(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    # Same keys as build_group_index
+    return (
+        df["state"].astype(str).str.lower().to_numpy(),
+        df["river_name"].astype(str).str.lower().to_numpy(),
+    )
+
+
+def _check_replaceable(out: Path) -> None:
+    """Refuse to replace anything but a missing or empty directory or an existing store."""
+    if not out.exists():
+        return
+    if not out.is_dir():
+        raise FileExistsError(f"{out} exists and is not a directory")
+    if any(out.iterdir()) and not (out / STORE_MANIFEST).exists():
+        raise FileExistsError(
+            f"{out} is not empty and holds no {STORE_MANIFEST}; refusing to replace it"
+        )
+
+
+def ingest_csv(
+    csv_path: str,
+    out_dir: str,
+    chunk_rows: int = 200_000,
+    sample_rows: int = 200_000,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Build a partitioned store for `csv_path` in `out_dir` and return its manifest.
+
+    Alongside the partitions, the store holds the fitted `FeatureTransformer`
+    (to score new observations) and a uniform sample of up to `sample_rows`
+    preprocessed rows (to train on).
+
+    The store is built in `<out_dir>.partial` and replaces `out_dir` once
+    complete. `out_dir` must be missing, empty or an earlier store.
+    """
+    _require_pyarrow()
+
+    target = Path(out_dir)
+    _check_replaceable(target)
+    out = target.with_name(target.name + ".partial")
+    if out.exists():
+        shutil.rmtree(out)
+    parts_dir = out / "parts"
+    parts_dir.mkdir(parents=True)
+
+    # Pass 1: global statistics
+    stats = FeatureStatistics()
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+        stats.update(derive_features(chunk))
+    transformer = stats.to_transformer()
+
+    # Pass 2: transform and append each chunk's rows to their partitions
+    partitions: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+    rng = np.random.default_rng(seed)
+    sample: Optional[pd.DataFrame] = None
+    for chunk_no, chunk in enumerate(pd.read_csv(csv_path, chunksize=chunk_rows)):
+        df = transformer.transform(chunk, copy=False)
+        state_keys, river_keys = _pair_keys(df)
+        groups = pd.Series(np.arange(len(df))).groupby([state_keys, river_keys], sort=False).indices
+        for key, positions in groups.items():
+            part = partitions.get(key)
+            if part is None:
+                first = positions[0]
+                part = {
+                    "id": len(partitions),
+                    "state": str(df["state"].iloc[first]),
+                    "river": str(df["river_name"].iloc[first]),
+                    "rows": 0,
+                }
+                partitions[key] = part
+            part["rows"] += len(positions)
+            part_dir = parts_dir / f"{part['id']:06d}"
+            part_dir.mkdir(exist_ok=True)
+            df.iloc[positions].to_parquet(part_dir / f"{chunk_no:06d}.parquet", index=False)
+
+        if sample_rows:
+            # Reservoir by random keys: the sample_rows smallest keys seen so far
+            keyed = df.assign(_sample_key=rng.random(len(df)))
+            sample = keyed if sample is None else pd.concat([sample, keyed], ignore_index=True)
+            sample = sample.nsmallest(sample_rows, "_sample_key")
+
+    # Compact every partition into a single file, one partition in memory at a time
+    partitions_dir = out / "partitions"
+    partitions_dir.mkdir()
+    for part in partitions.values():
+        part_dir = parts_dir / f"{part['id']:06d}"
+        frame = pd.concat(
+            [pd.read_parquet(p) for p in sorted(part_dir.glob("*.parquet"))], ignore_index=True
+        )
+        part["file"] = f"partitions/{part['id']:06d}.parquet"
+        frame.to_parquet(out / part["file"], index=False)
+        shutil.rmtree(part_dir)
+    parts_dir.rmdir()
+
+    save_feature_transformer(transformer, str(out))
+    if sample is not None:
+        sample.sort_values("_sample_key").drop(columns="_sample_key").to_parquet(
+            out / TRAINING_SAMPLE_FILENAME, index=False
+        )
+
+    rivers_by_state: Dict[str, List[str]] = {}
+    for (state_key, _), part in partitions.items():
+        rivers_by_state.setdefault(state_key, []).append(part["river"])
+    manifest = {
+        "version": STORE_VERSION,
+        "source": str(Path(csv_path).resolve()),
+        "rows": stats.n_rows,
+        "chunk_rows": chunk_rows,
+        "partitions": [
+            {k: part[k] for k in ("state", "river", "rows", "file")} for part in partitions.values()
+        ],
+        "states": sorted({part["state"] for part in partitions.values()}),
+        "rivers_by_state": {k: sorted(set(v)) for k, v in rivers_by_state.items()},
+        "training_sample_rows": 0 if sample is None else len(sample),
+    }
+    (out / STORE_MANIFEST).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+    # Swap the finished store in
+    old = target.with_name(target.name + ".old")
+    if old.exists():
+        shutil.rmtree(old)
+    if target.exists():
+        target.rename(old)
+    out.rename(target)
+    if old.exists():
+        shutil.rmtree(old)
+    return manifest
+
+
+class PartitionedStore:
+    """
+    Read side of a store written by `ingest_csv`. Partitions are loaded on
+    demand and the `cache_partitions` most recently used ones are kept.
+    """
+
+    def __init__(self, store_dir: str, cache_partitions: int = 8):
+        self.path = Path(store_dir)
+        self.manifest = json.loads((self.path / STORE_MANIFEST).read_text(encoding="utf-8"))
+        if self.manifest.get("version") != STORE_VERSION:
+            raise ValueError(f"Unsupported store version in {store_dir}")
+        self._files = {
+            (p["state"].lower(), p["river"].lower()): p["file"] for p in self.manifest["partitions"]
+        }
+        self._cache: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+        self._cache_size = cache_partitions
+
+    @property
+    def states(self) -> List[str]:
+        return self.manifest["states"]
+
+    def rivers(self, state: Optional[str] = None) -> List[str]:
+        if state is None:
+            return sorted({p["river"] for p in self.manifest["partitions"]})
+        return self.manifest["rivers_by_state"].get(state.lower(), [])
+
+    def frame(self, state: str, river_name: str) -> pd.DataFrame:
+        """Preprocessed rows of one (state, river_name) pair; empty if unknown."""
+        file = self._files.get((state.lower(), river_name.lower()))
+        if file is None:
+            return pd.DataFrame(columns=FEATURE_COLUMNS + ["river_name"])
+        frame = self._cache.get(file)
+        if frame is None:
+            frame = pd.read_parquet(self.path / file)
+            self._cache[file] = frame
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(file)
+        return frame
+
+    def feature_transformer(self) -> FeatureTransformer:
+        return load_feature_transformer(str(self.path))
+
+    def training_sample(self) -> pd.DataFrame:
+        return pd.read_parquet(self.path / TRAINING_SAMPLE_FILENAME)
+
+    def iter_advisories(self, model, state: str, river_name: str) -> Iterator[Dict[str, Any]]:
+        yield from iter_advisories_for_state(model, self.frame(state, river_name), state, river_name)
+
+    def heatmap_points(
+        self, state: str, river_name: str, weight: str = "juvenile_risk_prob"
+    ) -> List[Dict[str, float]]:
+        return generate_heatmap_points(self.frame(state, river_name), state, river_name, weight)
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest a large fisheries CSV into a partitioned store")
+    parser.add_argument("--data-path", type=str, required=True, help="Path to the fisheries CSV dataset.")
+    parser.add_argument(
+        "--out", type=str, required=True, help="Output store directory (replaced if it holds an earlier store)."
+    )
+    parser.add_argument("--chunk-rows", type=int, default=200_000)
+    parser.add_argument("--sample-rows", type=int, default=200_000, help="Rows kept for training.")
+    parser.add_argument(
+        "--train", action="store_true", help="Train the zone classifier on the sample and save it in the store."
+    )
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    manifest = ingest_csv(args.data_path, args.out, args.chunk_rows, args.sample_rows)
+    print(
+        f"Ingested {manifest['rows']} rows into {len(manifest['partitions'])} partitions "
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+
+    if args.train:
+        store = PartitionedStore(args.out)
+        sample = store.training_sample()
+        model, eval_results = train_zone_classifier(
+            sample[FEATURE_COLUMNS], sample["zone_label"], build_preprocessor()
+        )
+        save_model(model, eval_results, data_fingerprint(args.data_path), args.out)
+        print(f"Trained on {len(sample)} sampled rows, accuracy {eval_results['accuracy']:.3f}")
+
+    peak = _peak_rss_mb()
+    if peak is not None:
+        print(f"Peak memory: {peak:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+One-time conversion of the fisheries CSV into a typed columnar file.
+
+Reads the CSV, runs the row-local feature derivation (juvenile range parsing,
+risk flags, juvenile_risk_score) once, and writes raw plus derived columns
+as Parquet or Arrow IPC (Feather v2, uncompressed and memory-mappable). The
+file is tagged with the PIPELINE_VERSION that derived it, so
+`load_and_preprocess` reads the columns as-is instead of parsing strings;
+point FISH_DATA_PATH at it and the format is detected automatically.
+Dataset-wide statistics (economic rank, medians) are still fitted on load,
+which is vectorized and cheap.
+
+    python -m ML.convert_dataset --data-path converted_final.csv --out converted_final.parquet
+    python -m ML.convert_dataset --data-path converted_final.csv --out converted_final.arrow
+
+Requires pyarrow.
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+from ML.fish_advisory_pipeline import (
+    DATASET_METADATA_KEY,
+    PIPELINE_VERSION,
+    derive_features,
+    load_and_preprocess,
+)
+
+
+FORMAT_SUFFIXES = {
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+}
+
+
+def convert_dataset(csv_path: str, out_path: str, fmt: Optional[str] = None) -> str:
+    """Write `csv_path` with derived features to `out_path`; returns the format used."""
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+
+    fmt = fmt or FORMAT_SUFFIXES.get(Path(out_path).suffix.lower())
+    if fmt not in ("parquet", "arrow"):
+        raise ValueError(f"Cannot infer the format of {out_path}; pass --format parquet|arrow")
+
+    df = derive_features(pd.read_csv(csv_path))
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    meta = {"pipeline_version": PIPELINE_VERSION, "derived": True, "source": str(Path(csv_path).name)}
+    table = table.replace_schema_metadata(
+        {**(table.schema.metadata or {}), DATASET_METADATA_KEY: json.dumps(meta).encode("utf-8")}
+    )
+
+    out = Path(out_path)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(out.name + ".tmp")
+    if fmt == "parquet":
+        pq.write_table(table, tmp)
+    else:
+        with pa.OSFile(str(tmp), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    # Replace in one step: a server watching the file never reads half of it
+    tmp.replace(out)
+    return fmt
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert the fisheries CSV to Parquet or Arrow")
+    parser.add_argument("--data-path", type=str, required=True, help="Path to the fisheries CSV dataset.")
+    parser.add_argument("--out", type=str, required=True, help="Output file (.parquet or .arrow).")
+    parser.add_argument("--format", choices=["parquet", "arrow"], default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    fmt = convert_dataset(args.data_path, args.out, args.format)
+    print(f"Wrote {args.out} ({fmt}, {Path(args.out).stat().st_size / 1e6:.2f} MB) in {time.perf_counter() - start:.2f}s")
+
+    for label, path in (("csv", args.data_path), (fmt, args.out)):
+        start = time.perf_counter()
+        load_and_preprocess(path)
+        print(f"load_and_preprocess({label}): {time.perf_counter() - start:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Offline export of the advisories for every (state, river) pair.
+
+The model is loaded (or trained, once) and every row is scored once by
+`prepare_shared_state`, which writes the memory-mapped state into a private
+temporary directory that is removed afterwards. Pool workers map that state
+read-only, so the operating system keeps one copy of the model and the data
+for all of them, and each worker assembles the advisories of one pair at a
+time and writes them to that pair's own file:
+
+    <out>/<state>/<river>.jsonl      (or .parquet)
+    <out>/manifest.json              pairs, row counts, files, data fingerprint
+
+The export is written next to `<out>` and moved into place when complete, so
+readers never see a partial export.
+
+    python -m ML.export_advisories --data-path converted_final.csv --out advisories --workers 8
+
+`--shared-dir` reuses the state serve.py already built instead. It is only
+read, and the export refuses to run unless that state was built from
+`--data-path` and the model in `--model-dir` as they are now.
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from ML.fish_advisory_pipeline import advisories_for_rows
+from ML.shared_store import (
+    SharedState,
+    load_shared_state,
+    matching_shared_state,
+    prepare_shared_state,
+)
+
+
+BACKEND_DIR = Path(__file__).parent.parent
+FORMATS = {"jsonl": ".jsonl", "parquet": ".parquet"}
+MANIFEST_FILENAME = "manifest.json"
+
+# Set in each pool worker by _init_worker (and in the parent when exporting in-process)
+_state: Optional[SharedState] = None
+
+
+def _init_worker(shared_dir: str) -> None:
+    global _state
+    # The compiled forest is memory-mapped; the rows are already scored anyway
+    _state = load_shared_state(shared_dir, inference_backend="numpy")
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^0-9A-Za-z]+", "_", name).strip("_").lower() or "unknown"
+
+
+def _write_advisories(advisories: List[Dict[str, Any]], path: Path, fmt: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if fmt == "parquet":
+        pd.DataFrame(advisories).to_parquet(path, index=False)
+        return
+    with open(path, "w", encoding="utf-8") as fh:
+        for advisory in advisories:
+            fh.write(json.dumps(advisory, ensure_ascii=False))
+            fh.write("\n")
+
+
+def _check_replaceable(out: Path) -> None:
+    """Refuse to replace anything but a missing or empty directory or an earlier export."""
+    if not out.exists():
+        return
+    if not out.is_dir():
+        raise FileExistsError(f"{out} exists and is not a directory")
+    if any(out.iterdir()) and not (out / MANIFEST_FILENAME).exists():
+        raise FileExistsError(
+            f"{out} is not empty and holds no {MANIFEST_FILENAME}; refusing to replace it"
+        )
+
+
+def _export_pair(key: Tuple[str, str], path: str, fmt: str) -> Dict[str, Any]:
+    start = time.perf_counter()
+    state = _state
+    positions = state.index.positions[key]
+    advisories = advisories_for_rows(
+        state.model, state.df_full, positions, (state.zones, state.confidences)
+    )
+    _write_advisories(advisories, Path(path), fmt)
+    return {"key": key, "advisories": len(advisories), "seconds": time.perf_counter() - start}
+
+
+def _plan(state: SharedState, fmt: str) -> List[Dict[str, Any]]:
+    """One entry per pair, with display names and a unique relative output path."""
+    plan = []
+    used = set()
+    for key, positions in state.index.positions.items():
+        first = int(positions[0])
+        display_state = str(state.df_full["state"].iloc[first])
+        display_river = str(state.df_full["river_name"].iloc[first])
+        rel = f"{_slug(display_state)}/{_slug(display_river)}"
+        candidate, n = rel, 1
+        while candidate in used:
+            n += 1
+            candidate = f"{rel}_{n}"
+        used.add(candidate)
+        plan.append(
+            {
+                "key": key,
+                "state": display_state,
+                "river_name": display_river,
+                "file": candidate + FORMATS[fmt],
+            }
+        )
+    plan.sort(key=lambda p: (p["state"].lower(), p["river_name"].lower()))
+    return plan
+
+
+class _Progress:
+    def __init__(self, total: int, enabled: bool, every: float = 0.5):
+        self.total = total
+        self.enabled = enabled
+        self.every = every
+        self.done = 0
+        self.advisories = 0
+        self.start = time.perf_counter()
+        self._last = 0.0
+
+    def update(self, advisories: int) -> None:
+        self.done += 1
+        self.advisories += advisories
+        now = time.perf_counter()
+        if self.enabled and (now - self._last >= self.every or self.done == self.total):
+            self._last = now
+            elapsed = now - self.start
+            eta = elapsed / self.done * (self.total - self.done)
+            print(
+                f"[{self.done}/{self.total} pairs] {self.advisories:,} advisories, "
+                f"{elapsed:.1f}s elapsed, ~{eta:.1f}s left",
+                file=sys.stderr,
+                flush=True,
+            )
+
+
+def export_advisories(
+    data_path: str,
+    out_dir: str,
+    model_dir: str,
+    shared_dir: Optional[str] = None,
+    fmt: str = "jsonl",
+    workers: Optional[int] = None,
+    progress: bool = True,
+) -> Dict[str, Any]:
+    """
+    Export every pair's advisories to `out_dir` and return the export manifest.
+
+    `out_dir` must be missing, empty or an earlier export; it is replaced once
+    the new export is complete. The shared state is built in a temporary
+    directory unless `shared_dir` names an existing one built from `data_path`
+    and the model in `model_dir`, which is then used read-only.
+    """
+    global _state
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt} (expected one of {', '.join(FORMATS)})")
+    workers = workers or os.cpu_count() or 1
+    out = Path(out_dir)
+    _check_replaceable(out)
+
+    try:
+        if shared_dir is not None:
+            if matching_shared_state(data_path, model_dir, shared_dir) is None:
+                raise ValueError(
+                    f"{shared_dir} holds no shared state built from {data_path} and the model in "
+                    f"{model_dir} as they are now; "
+                    "refusing to use or rebuild it (omit --shared-dir to build a private copy)"
+                )
+            return _export(data_path, out, model_dir, shared_dir, fmt, workers, progress)
+        with tempfile.TemporaryDirectory(prefix="fish-export-") as private_dir:
+            return _export(data_path, out, model_dir, private_dir, fmt, workers, progress)
+    finally:
+        _state = None
+
+
+def _export(
+    data_path: str,
+    out: Path,
+    model_dir: str,
+    shared_dir: str,
+    fmt: str,
+    workers: int,
+    progress: bool,
+) -> Dict[str, Any]:
+    start = time.perf_counter()
+    shared_manifest = prepare_shared_state(data_path, model_dir, shared_dir)
+    _init_worker(shared_dir)
+    prepare_seconds = time.perf_counter() - start
+    plan = _plan(_state, fmt)
+
+    staging = out.with_name(out.name + ".partial")
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir(parents=True)
+
+    by_key = {p["key"]: p for p in plan}
+    tracker = _Progress(len(plan), progress)
+    export_start = time.perf_counter()
+    if workers <= 1:
+        for p in plan:
+            result = _export_pair(p["key"], str(staging / p["file"]), fmt)
+            by_key[result["key"]]["advisories"] = result["advisories"]
+            tracker.update(result["advisories"])
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(shared_dir,)
+        ) as pool:
+            futures = [
+                pool.submit(_export_pair, p["key"], str(staging / p["file"]), fmt) for p in plan
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                by_key[result["key"]]["advisories"] = result["advisories"]
+                tracker.update(result["advisories"])
+    export_seconds = time.perf_counter() - export_start
+
+    manifest = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "format": fmt,
+        "fingerprint": shared_manifest["fingerprint"],
+        "model_accuracy": _state.eval_results.get("accuracy"),
+        "rows": shared_manifest["rows"],
+        "advisories": tracker.advisories,
+        "workers": workers,
+        "prepare_seconds": prepare_seconds,
+        "export_seconds": export_seconds,
+        "pairs": [{k: v for k, v in p.items() if k != "key"} for p in plan],
+    }
+    (staging / MANIFEST_FILENAME).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+    # Swap the finished export in
+    old = out.with_name(out.name + ".old")
+    if old.exists():
+        shutil.rmtree(old)
+    if out.exists():
+        out.rename(old)
+    staging.rename(out)
+    if old.exists():
+        shutil.rmtree(old)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export advisories for every state/river pair")
+    parser.add_argument("--data-path", type=str, required=True, help="Path to the fisheries dataset.")
+    parser.add_argument("--out", type=str, required=True, help="Output directory (an earlier export there is replaced when done).")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="jsonl")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--model-dir",
+        default=os.getenv("FISH_MODEL_DIR", str(BACKEND_DIR / "model_artifacts")),
+        help="Trained model artifacts (reused when they match the dataset).",
+    )
+    parser.add_argument(
+        "--shared-dir",
+        default=None,
+        help=(
+            "Reuse serve.py's memory-mapped state from this directory, read-only; it must have "
+            "been built from --data-path and --model-dir. By default a private copy is built "
+            "and removed."
+        ),
+    )
+    parser.add_argument("--quiet", action="store_true", help="No progress output.")
+    args = parser.parse_args()
+
+    manifest = export_advisories(
+        args.data_path,
+        args.out,
+        args.model_dir,
+        args.shared_dir,
+        fmt=args.format,
+        workers=args.workers,
+        progress=not args.quiet,
+    )
+    print(
+        f"Exported {manifest['advisories']:,} advisories for {len(manifest['pairs'])} pairs to "
+        f"{args.out} in {manifest['prepare_seconds'] + manifest['export_seconds']:.2f}s "
+        f"(model and scores {manifest['prepare_seconds']:.2f}s, export {manifest['export_seconds']:.2f}s, "
+        f"{manifest['workers']} workers)"
+    )
+
+
+if __name__ == "__main__":
+    main()
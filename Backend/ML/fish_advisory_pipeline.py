@@ -1,6 +1,9 @@
 import json
-from dataclasses import dataclass, asdict
-from typing import List, Dict, Any, Optional, Tuple
+import sys
+import threading
+import time
+from dataclasses import dataclass, asdict, field
+from typing import List, Dict, Any, Callable, Iterator, Mapping, Optional, Set, Tuple
 
 import argparse
 import numpy as np
@@ -13,16 +16,122 @@ from sklearn.metrics import (
     confusion_matrix,
 )
 from sklearn.model_selection import train_test_split
+from sklearn.neighbors import BallTree
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 
 
 JUVENILE_RANGE_COL = "juvenile_range_cm"
 
+# Bump whenever feature engineering, training or the layout of persisted
+# artifacts changes, so that artifacts written by older code are not reused.
+# 2: vectorized juvenile range parsing, compacted serving frame, compiled
+#    forest arrays in the shared state
+PIPELINE_VERSION = "2"
+
+# Schema metadata key of columnar datasets written by ML/convert_dataset.py
+DATASET_METADATA_KEY = b"fish_advisory"
+
+# Mean Earth radius used for haversine distances
+EARTH_RADIUS_KM = 6371.0088
+
 
 NON_SELECTIVE_GEARS = {"Trawl", "Purse Seine"}
 MONSOON_SEASONS = {"Monsoon", "Post-Monsoon", "Post Monsoon"}
 
+# Model features, in the order the ColumnTransformer sees them
+NUMERIC_FEATURES = [
+    "sea_surface_temp_C",
+    "chlorophyll_mg_m3",
+    "depth_m",
+    "min_legal_size_cm",
+    "juvenile_min_cm",
+    "juvenile_max_cm",
+    "juvenile_risk_score",
+    "economic_priority_score",
+]
+CATEGORICAL_FEATURES = ["state", "water_type", "season", "gear_type"]
+BOOLEAN_FEATURES = [
+    "juvenile_dominance",
+    "disease_risk",
+    "is_shallow",
+    "high_chl",
+    "is_monsoonish",
+    "is_brackish",
+    "non_selective_gear",
+]
+FEATURE_COLUMNS = NUMERIC_FEATURES + CATEGORICAL_FEATURES + BOOLEAN_FEATURES
+
+# Raw CSV columns nothing reads once features are derived and the model is trained
+UNSERVED_COLUMNS = ["common_name", "zone_label", JUVENILE_RANGE_COL]
+
+# Raw columns a new observation needs for scoring (see `prepare_observations`)
+OBSERVATION_NUMERIC_COLUMNS = [
+    "sea_surface_temp_C",
+    "chlorophyll_mg_m3",
+    "depth_m",
+    "min_legal_size_cm",
+    "economic_value_in_INR_per_kg",
+]
+OBSERVATION_REQUIRED_COLUMNS = CATEGORICAL_FEATURES + OBSERVATION_NUMERIC_COLUMNS
+OBSERVATION_OPTIONAL_COLUMNS = [JUVENILE_RANGE_COL, "seasonal_disease"]
+
+
+# Stage timing hook, e.g. for Backend/metrics.py: called as
+# recorder(stage, seconds, rows) at the end of every `span`. None disables it.
+SpanRecorder = Callable[[str, float, Optional[int]], None]
+_span_recorder: Optional[SpanRecorder] = None
+
+
+def set_span_recorder(recorder: Optional[SpanRecorder]) -> None:
+    """Install (or with None, remove) the function that receives stage timings."""
+    global _span_recorder
+    _span_recorder = recorder
+
+
+class _Span:
+    __slots__ = ("stage", "rows", "_start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        # Set inside the block to report how many rows the stage handled
+        self.rows: Optional[int] = None
+
+    def __enter__(self) -> "_Span":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        recorder = _span_recorder
+        if recorder is not None:
+            recorder(self.stage, time.perf_counter() - self._start, self.rows)
+
+
+class _NullSpan:
+    __slots__ = ("rows",)
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(stage: str):
+    """
+    Time a block as `stage`:
+
+        with span("advisories.predict") as sp:
+            ...
+            sp.rows = len(X)
+
+    Without a recorder installed this returns a shared no-op context manager.
+    """
+    return _NULL_SPAN if _span_recorder is None else _Span(stage)
+
 
 @dataclass
 class AdvisoryOutput:
@@ -53,15 +162,35 @@ def _parse_juvenile_range(range_str: str) -> Tuple[Optional[float], Optional[flo
         return None, None
 
 
-def load_and_preprocess(
-    csv_path: str,
-) -> Tuple[pd.DataFrame, pd.Series, ColumnTransformer, pd.DataFrame]:
-    df = pd.read_csv(csv_path)
+def parse_juvenile_ranges(values: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Column version of `_parse_juvenile_range`: returns (min, max) float64
+    arrays, NaN where the value is missing or malformed.
+
+    Range strings repeat heavily (one per species and size class), so each
+    distinct value is parsed once and the results are gathered back per row
+    by their factorized codes; per-row work is vectorized.
+    """
+    codes, uniques = pd.factorize(values)
+    parsed = np.array(
+        [[np.nan if v is None else v for v in _parse_juvenile_range(u)] for u in uniques],
+        dtype=np.float64,
+    ).reshape(-1, 2)
+    # Missing values have code -1
+    parsed = np.vstack([parsed, [np.nan, np.nan]])
+    return parsed[codes, 0], parsed[codes, 1]
 
+
+def derive_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add the row-local engineered columns (parsed juvenile range, risk flags,
+    juvenile_risk_score) to `df` in place and return it.
+
+    Dataset-wide features (economic priority rank, median fills) are added
+    by `FeatureTransformer`.
+    """
     # Parse juvenile range
-    juvenile_min, juvenile_max = zip(*df[JUVENILE_RANGE_COL].map(_parse_juvenile_range))
-    df["juvenile_min_cm"] = juvenile_min
-    df["juvenile_max_cm"] = juvenile_max
+    df["juvenile_min_cm"], df["juvenile_max_cm"] = parse_juvenile_ranges(df[JUVENILE_RANGE_COL])
 
     # Juvenile dominance flag: True if juvenile_max_cm < min_legal_size_cm
     df["juvenile_dominance"] = (
@@ -87,81 +216,211 @@ def load_and_preprocess(
         "is_brackish",
         "non_selective_gear",
     ]
-    df["juvenile_risk_score"] = df[risk_components].astype(int).sum(axis=1)
-
-    # Economic priority score: rank-based (0–1)
-    df["economic_priority_score"] = (
-        df["economic_value_in_INR_per_kg"].rank(method="max") / len(df)
+    df["juvenile_risk_score"] = np.sum(
+        [df[col].to_numpy(dtype=bool) for col in risk_components], axis=0, dtype=np.int64
     )
+    return df
 
-    # Target
-    y = df["zone_label"]
-
-    # Select features for ML
-    numeric_features = [
-        "sea_surface_temp_C",
-        "chlorophyll_mg_m3",
-        "depth_m",
-        "min_legal_size_cm",
-        "juvenile_min_cm",
-        "juvenile_max_cm",
-        "juvenile_risk_score",
-        "economic_priority_score",
-    ]
-    categorical_features = ["state", "water_type", "season", "gear_type"]
-    boolean_features = [
-        "juvenile_dominance",
-        "disease_risk",
-        "is_shallow",
-        "high_chl",
-        "is_monsoonish",
-        "is_brackish",
-        "non_selective_gear",
-    ]
-
-    # Handle missing numeric values with water_type specific median
-    for col in numeric_features:
-        if df[col].isna().any():
-            df[col] = df.groupby("water_type")[col].transform(
-                lambda x: x.fillna(x.median())
-            )
 
+def _fill_flags_and_categories(df: pd.DataFrame) -> None:
     # For booleans, fill missing with False
-    for col in boolean_features:
+    for col in BOOLEAN_FEATURES:
         if df[col].isna().any():
             df[col] = df[col].fillna(False)
 
     # For categoricals, fill missing with explicit unknown token
-    for col in categorical_features:
+    for col in CATEGORICAL_FEATURES:
         if df[col].isna().any():
             df[col] = df[col].fillna("Unknown")
 
-    X = df[numeric_features + categorical_features + boolean_features].copy()
 
-    # Column transformer for ML
-    preprocessor = ColumnTransformer(
+class FeatureTransformer:
+    """
+    Dataset-wide feature engineering, fitted once and reusable on new data.
+
+    `fit` learns the economic value rank breakpoints and the per-`water_type`
+    medians used to fill missing numerics; `transform` applies them (plus the
+    row-local `derive_features`) to any batch in time proportional to the
+    batch, independent of the size of the fitted dataset.
+    """
+
+    def __init__(self):
+        self.n_rows_: int = 0
+        # Distinct economic values (sorted) and how many rows are <= each
+        self.econ_values_: Optional[np.ndarray] = None
+        self.econ_cum_counts_: Optional[np.ndarray] = None
+        # water_type -> median of each numeric feature
+        self.medians_: Optional[pd.DataFrame] = None
+
+    @property
+    def is_fitted(self) -> bool:
+        return self.medians_ is not None
+
+    def fit(self, df: pd.DataFrame) -> "FeatureTransformer":
+        self.fit_transform(df)
+        return self
+
+    def fit_transform(
+        self, df: pd.DataFrame, copy: bool = True, derived: bool = False
+    ) -> pd.DataFrame:
+        """Fit on `df` and transform it; `derived=True` skips `derive_features`."""
+        if copy:
+            df = df.copy()
+        if not derived:
+            derive_features(df)
+
+        econ = df["economic_value_in_INR_per_kg"].to_numpy(dtype=np.float64)
+        values, counts = np.unique(econ[~np.isnan(econ)], return_counts=True)
+        self.n_rows_ = len(df)
+        self.econ_values_ = values
+        self.econ_cum_counts_ = np.cumsum(counts)
+        df["economic_priority_score"] = self._econ_score(econ)
+
+        # Medians before any filling, like groupby(...).transform(median)
+        self.medians_ = df.groupby(df["water_type"].astype(object))[NUMERIC_FEATURES].median()
+        self._fill(df)
+        return df
+
+    def transform(self, df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
+        if not self.is_fitted:
+            raise RuntimeError("FeatureTransformer must be fitted before transform")
+        if copy:
+            df = df.copy()
+        derive_features(df)
+        df["economic_priority_score"] = self._econ_score(
+            df["economic_value_in_INR_per_kg"].to_numpy(dtype=np.float64)
+        )
+        self._fill(df)
+        return df
+
+    def _econ_score(self, econ: np.ndarray) -> np.ndarray:
+        # rank(method="max") / n: the number of fitted values <= x, over n
+        pos = np.searchsorted(self.econ_values_, econ, side="right")
+        cum = np.concatenate(([0], self.econ_cum_counts_))
+        score = cum[pos] / max(self.n_rows_, 1)
+        return np.where(np.isnan(econ), np.nan, score)
+
+    def _fill(self, df: pd.DataFrame) -> None:
+        # Missing numerics -> median of the row's water_type (rows whose
+        # water_type was not seen in fit stay missing)
+        group = self.medians_.index.get_indexer(df["water_type"].astype(object))
+        known = group >= 0
+        for col in NUMERIC_FEATURES:
+            values = df[col].to_numpy(dtype=np.float64)
+            missing = np.isnan(values)
+            if missing.any():
+                fill = np.full(len(values), np.nan)
+                fill[known] = self.medians_[col].to_numpy(dtype=np.float64)[group[known]]
+                df[col] = np.where(missing, fill, values)
+
+        _fill_flags_and_categories(df)
+
+
+def detect_dataset_format(path: str) -> str:
+    """"parquet" or "arrow" (IPC file / Feather v2) by magic bytes, else "csv"."""
+    with open(path, "rb") as fh:
+        head = fh.read(6)
+    if head[:4] == b"PAR1":
+        return "parquet"
+    if head == b"ARROW1":
+        return "arrow"
+    return "csv"
+
+
+def read_dataset(path: str) -> Tuple[pd.DataFrame, bool]:
+    """
+    Read a dataset file of any supported format and return (df, derived).
+
+    `derived` is True when the file already holds the `derive_features`
+    columns computed by the current PIPELINE_VERSION. Parquet and Arrow
+    files need pyarrow; Arrow files are memory-mapped.
+    """
+    fmt = detect_dataset_format(path)
+    if fmt == "csv":
+        return pd.read_csv(path), False
+
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(
+            f"Reading {fmt} datasets requires pyarrow (pip install pyarrow)"
+        ) from e
+
+    if fmt == "parquet":
+        table = pq.read_table(path, memory_map=True)
+    else:
+        with pa.memory_map(path) as source:
+            table = pa.ipc.open_file(source).read_all()
+
+    meta = json.loads((table.schema.metadata or {}).get(DATASET_METADATA_KEY, b"{}"))
+    derived = bool(meta.get("derived")) and meta.get("pipeline_version") == PIPELINE_VERSION
+    return table.to_pandas(), derived
+
+
+def load_and_preprocess(
+    csv_path: str,
+    transformer: Optional[FeatureTransformer] = None,
+) -> Tuple[pd.DataFrame, pd.Series, ColumnTransformer, pd.DataFrame]:
+    """
+    Read `csv_path` and engineer the model features.
+
+    `csv_path` may also be a Parquet or Arrow file from ML/convert_dataset.py
+    (see `read_dataset`), in which case the row-local features are read
+    instead of derived.
+
+    Pass a `FeatureTransformer` to keep it: it is fitted on this file in
+    place, so it can later transform new observations the same way.
+    """
+    df, derived = read_dataset(csv_path)
+    if transformer is None:
+        transformer = FeatureTransformer()
+    transformer.fit_transform(df, copy=False, derived=derived)
+
+    # Target
+    y = df["zone_label"]
+
+    # Select features for ML
+    X = df[FEATURE_COLUMNS].copy()
+
+    return X, y, build_preprocessor(), df
+
+
+def build_preprocessor() -> ColumnTransformer:
+    """The (unfitted) column transformer in front of the classifier."""
+    return ColumnTransformer(
         transformers=[
-            ("num", StandardScaler(), numeric_features),
+            ("num", StandardScaler(), NUMERIC_FEATURES),
             (
                 "cat",
                 OneHotEncoder(handle_unknown="ignore"),
-                categorical_features,
+                CATEGORICAL_FEATURES,
             ),
             # Booleans go through as-is
-            ("bool", "passthrough", boolean_features),
+            ("bool", "passthrough", BOOLEAN_FEATURES),
         ]
     )
 
-    return X, y, preprocessor, df
 
+# RandomForest classifier with higher cost for misclassifying Red/Yellow as Green
+ZONE_CLASS_WEIGHTS = {"Green": 1.0, "Yellow": 2.0, "Red": 3.0}
 
-def train_zone_classifier(
-    X: pd.DataFrame,
-    y: pd.Series,
-    preprocessor: ColumnTransformer,
-    random_state: int = 42,
-) -> Tuple[Pipeline, Dict[str, Any]]:
-    X_train, X_test, y_train, y_test = train_test_split(
+# Forest settings used unless `train_zone_classifier` is given others
+# (e.g. the ones picked by ML/model_search.py)
+DEFAULT_FOREST_PARAMS = {
+    "n_estimators": 300,
+    "max_depth": None,
+    "min_samples_split": 4,
+    "min_samples_leaf": 2,
+}
+
+
+def holdout_split(
+    X: pd.DataFrame, y: pd.Series, random_state: int = 42
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.Series, pd.Series]:
+    """The stratified 80/20 (X_train, X_test, y_train, y_test) split models are evaluated on."""
+    return train_test_split(
         X,
         y,
         test_size=0.2,
@@ -169,15 +428,19 @@ def train_zone_classifier(
         random_state=random_state,
     )
 
-    # RandomForest classifier with higher cost for misclassifying Red/Yellow as Green
-    class_weights = {"Green": 1.0, "Yellow": 2.0, "Red": 3.0}
+
+def train_zone_classifier(
+    X: pd.DataFrame,
+    y: pd.Series,
+    preprocessor: ColumnTransformer,
+    random_state: int = 42,
+    forest_params: Optional[Dict[str, Any]] = None,
+) -> Tuple[Pipeline, Dict[str, Any]]:
+    X_train, X_test, y_train, y_test = holdout_split(X, y, random_state)
 
     clf = RandomForestClassifier(
-        n_estimators=300,
-        max_depth=None,
-        min_samples_split=4,
-        min_samples_leaf=2,
-        class_weight=class_weights,
+        **{**DEFAULT_FOREST_PARAMS, **(forest_params or {})},
+        class_weight=ZONE_CLASS_WEIGHTS,
         random_state=random_state,
         n_jobs=-1,
     )
@@ -207,74 +470,296 @@ def train_zone_classifier(
     return model, eval_results
 
 
-def _juvenile_risk_probability(row: pd.Series) -> float:
-    # Map score (0–6) into 0–1 probability
-    max_score = 6.0
-    return float(np.clip(row["juvenile_risk_score"] / max_score, 0.0, 1.0))
+def compact_frame(
+    df: pd.DataFrame,
+    drop_columns: Optional[List[str]] = None,
+    max_category_ratio: float = 0.5,
+) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Return a smaller copy of a preprocessed frame for serving, plus a memory report.
 
+    - columns in `drop_columns` (default `UNSERVED_COLUMNS`) are removed
+    - string columns with at most `max_category_ratio` distinct values per row
+      become categoricals, so repeated values (states, gears, advisory texts)
+      are stored once
+    - integers are downcast to the smallest type holding their range, and
+      floats to float32 only where every value survives the round trip
 
-def generate_heatmap_points(
-    full_df: pd.DataFrame,
-    state: str,
-    river_name: str,
-    weight: str = "juvenile_risk_prob",
-) -> List[Dict[str, float]]:
+    Values are unchanged, so scoring and every endpoint give the same results.
     """
-    Returns points for frontend heatmap layers (e.g., Leaflet.heat).
+    before = int(df.memory_usage(deep=True).sum())
+    drop = UNSERVED_COLUMNS if drop_columns is None else drop_columns
+    out = df.drop(columns=[c for c in drop if c in df.columns])
+
+    columns: Dict[str, Any] = {}
+    for col in out.columns:
+        series = out[col]
+        if pd.api.types.is_bool_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype):
+            columns[col] = series
+        elif pd.api.types.is_integer_dtype(series):
+            columns[col] = pd.to_numeric(series, downcast="integer")
+        elif pd.api.types.is_float_dtype(series):
+            values = series.to_numpy(dtype=np.float64)
+            narrow = values.astype(np.float32)
+            lossless = np.array_equal(narrow.astype(np.float64), values, equal_nan=True)
+            columns[col] = pd.Series(narrow, index=series.index) if lossless else series
+        elif series.nunique(dropna=True) <= max_category_ratio * max(len(series), 1):
+            columns[col] = series.astype("category")
+        else:
+            columns[col] = series
+    out = pd.DataFrame(columns, index=out.index)
+
+    after = int(out.memory_usage(deep=True).sum())
+    report = {
+        "rows": len(out),
+        "bytes_before": before,
+        "bytes_after": after,
+        "dropped_columns": [c for c in drop if c in df.columns],
+        "categorical_columns": [
+            c for c in out.columns
+            if isinstance(out[c].dtype, pd.CategoricalDtype)
+            and not isinstance(df[c].dtype, pd.CategoricalDtype)
+        ],
+    }
+    return out, report
 
-    Output format: [{ "lat": <float>, "lon": <float>, "value": <float> }, ...]
 
-    - Filters by state + river_name (requires `river_name` column)
-    - `weight` can be:
-        - "juvenile_risk_prob" (default): derived from juvenile_risk_score
-        - "juvenile_risk_score": 0..6
-        - "chlorophyll_mg_m3": numeric
-        - "depth_m": numeric
+@dataclass
+class GroupIndex:
+    """
+    Case-insensitive lookup from (state, river_name) to row positions.
+
+    `positions` maps a lower-cased (state, river_name) key to the ascending
+    integer row positions of that pair in the indexed frame, so a query is a
+    dict lookup plus `iloc` instead of a string comparison over every row.
     """
+
+    positions: Dict[Tuple[str, str], np.ndarray]
+    states: List[str]
+    rivers_all: List[str]
+    rivers_by_state: Dict[str, List[str]]
+
+    def rows(self, state: str, river_name: str) -> np.ndarray:
+        return self.positions.get(
+            (state.lower(), river_name.lower()), np.empty(0, dtype=np.intp)
+        )
+
+    def rivers(self, state: Optional[str] = None) -> List[str]:
+        if not state:
+            return self.rivers_all
+        return self.rivers_by_state.get(state.lower(), [])
+
+
+def build_group_index(full_df: pd.DataFrame) -> GroupIndex:
+    """Build the (state, river_name) index for `full_df` in a single pass."""
     if "river_name" not in full_df.columns:
         raise ValueError(
             "Dataset does not contain 'river_name' column. "
             "Please use the updated CSV (e.g., converted_final.csv)."
         )
 
+    states = full_df["state"].astype(str)
+    rivers = full_df["river_name"].astype(str)
+    state_keys = states.str.lower()
+    river_keys = rivers.str.lower()
+
+    positions = {
+        key: np.asarray(pos, dtype=np.intp)
+        for key, pos in pd.Series(np.arange(len(full_df)))
+        .groupby([state_keys.to_numpy(), river_keys.to_numpy()], sort=False)
+        .indices.items()
+    }
+
+    pairs = pd.DataFrame({"state_key": state_keys, "river": rivers}).drop_duplicates()
+    rivers_by_state = {
+        key: sorted(group["river"].unique().tolist())
+        for key, group in pairs.groupby("state_key", sort=False)
+    }
+
+    return GroupIndex(
+        positions=positions,
+        states=sorted(full_df["state"].unique().tolist()),
+        rivers_all=sorted(rivers.unique().tolist()),
+        rivers_by_state=rivers_by_state,
+    )
+
+
+def _select_pair(
+    full_df: pd.DataFrame,
+    state: str,
+    river_name: str,
+    index: Optional[GroupIndex] = None,
+) -> pd.DataFrame:
+    """Rows of `full_df` for a state + river_name, matched case-insensitively."""
+    if index is not None:
+        return full_df.iloc[index.rows(state, river_name)]
+
     mask = (full_df["state"].str.lower() == state.lower()) & (
         full_df["river_name"].astype(str).str.lower() == river_name.lower()
     )
-    df = full_df.loc[mask].copy()
+    return full_df.loc[mask]
+
+
+class SpatialIndex:
+    """
+    Haversine BallTree over the latitude/longitude of a frame's rows, for
+    nearest-record queries by GPS position without scanning the frame.
+
+    With `lazy=True` the tree is built by `build()` or, failing that, on the
+    first query (e.g. in API workers, which should start fast and only pay for
+    it if used). Check `built` to run that first build somewhere it may block.
+    """
+
+    def __init__(self, full_df: pd.DataFrame, lazy: bool = False):
+        self._df: Optional[pd.DataFrame] = full_df
+        self._lock = threading.Lock()
+        self._built = False
+        if not lazy:
+            self.build()
+
+    @property
+    def built(self) -> bool:
+        return self._built
+
+    def build(self) -> None:
+        with self._lock:
+            if self._built:
+                return
+            self._index(self._df)
+            self._df = None
+            self._built = True
+
+    def _index(self, full_df: pd.DataFrame) -> None:
+        lat = full_df["latitude"].to_numpy(dtype=np.float64)
+        lon = full_df["longitude"].to_numpy(dtype=np.float64)
+        valid = ~(np.isnan(lat) | np.isnan(lon))
+        # Tree slot -> row position in full_df (rows without coordinates are left out)
+        self.positions = np.flatnonzero(valid)
+        self._tree = (
+            BallTree(np.radians(np.column_stack([lat[valid], lon[valid]])), metric="haversine")
+            if self.positions.size
+            else None
+        )
+        # Row position -> state, as small integer codes, so results are labelled
+        # without converting the frame's column per query. Missing states get
+        # code -1, which picks the trailing "nan" (as str(NaN) would).
+        codes, uniques = pd.factorize(full_df["state"])
+        self._state_names = np.array([str(u) for u in uniques] + ["nan"], dtype=object)
+        self._state_codes = codes.astype(np.min_scalar_type(-len(self._state_names)))
+
+    def states(self, positions: np.ndarray) -> List[str]:
+        """The state of each row position (as returned by `nearest`)."""
+        if not self._built:
+            self.build()
+        return self._state_names.take(self._state_codes[positions]).tolist()
+
+    def nearest(
+        self, lat: float, lon: float, k: int, radius_km: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Row positions and distances (km) of the up-to-k nearest rows within `radius_km`, closest first."""
+        if not self._built:
+            self.build()
+        if self._tree is None or k <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float64)
+        k = min(k, self.positions.size)
+        dist, slots = self._tree.query(np.radians([[lat, lon]]), k=k)
+        dist_km = dist[0] * EARTH_RADIUS_KM
+        within = dist_km <= radius_km
+        return self.positions[slots[0][within]], dist_km[within]
+
+
+def generate_heatmap_arrays(
+    full_df: pd.DataFrame,
+    state: str,
+    river_name: str,
+    weight: str = "juvenile_risk_prob",
+    index: Optional[GroupIndex] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Columnar form of `generate_heatmap_points`: returns contiguous float64
+    arrays (lat, lon, value) computed with array arithmetic only.
+    """
+    if "river_name" not in full_df.columns:
+        raise ValueError(
+            "Dataset does not contain 'river_name' column. "
+            "Please use the updated CSV (e.g., converted_final.csv)."
+        )
 
+    with span("heatmap.select") as sp:
+        df = _select_pair(full_df, state, river_name, index)
+        sp.rows = len(df)
+    empty = np.empty(0, dtype=np.float64)
     if df.empty:
-        return []
+        return empty, empty, empty
 
+    with span("heatmap.weights"):
+        return _heatmap_weights(df, weight)
+
+
+def _heatmap_weights(df: pd.DataFrame, weight: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(lat, lon, value) arrays for the already selected rows `df`."""
+    empty = np.empty(0, dtype=np.float64)
     if weight == "juvenile_risk_prob":
-        df["__w"] = df.apply(_juvenile_risk_probability, axis=1)
-    elif weight in df.columns:
-        df["__w"] = pd.to_numeric(df[weight], errors="coerce")
-    elif weight == "juvenile_risk_score":
-        df["__w"] = pd.to_numeric(df["juvenile_risk_score"], errors="coerce")
+        # Map score (0–6) into 0–1 probability
+        w = np.clip(df["juvenile_risk_score"].to_numpy(dtype=np.float64) / 6.0, 0.0, 1.0)
+    elif weight in df.columns or weight == "juvenile_risk_score":
+        col = df[weight]
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            col = col.astype(object)
+        w = pd.to_numeric(col, errors="coerce").to_numpy(dtype=np.float64)
     else:
         raise ValueError(f"Unknown weight: {weight}")
 
-    df = df.dropna(subset=["latitude", "longitude", "__w"])
-    # Clamp for sanity in heatmap rendering
-    w = df["__w"].astype(float)
-    if weight == "juvenile_risk_prob":
-        df["__w"] = np.clip(w, 0.0, 1.0)
-    else:
+    lat = df["latitude"].to_numpy(dtype=np.float64)
+    lon = df["longitude"].to_numpy(dtype=np.float64)
+    keep = ~(np.isnan(lat) | np.isnan(lon) | np.isnan(w))
+    if not keep.all():
+        lat, lon, w = lat[keep], lon[keep], w[keep]
+    if w.size == 0:
+        return empty, empty, empty
+
+    if weight != "juvenile_risk_prob":
         # Normalize arbitrary weights to 0..1 for consistent rendering
         w_min = float(w.min())
         w_max = float(w.max())
         if w_max > w_min:
-            df["__w"] = (w - w_min) / (w_max - w_min)
+            w = (w - w_min) / (w_max - w_min)
         else:
-            df["__w"] = 1.0
+            w = np.ones_like(w)
+
+    return np.ascontiguousarray(lat), np.ascontiguousarray(lon), np.ascontiguousarray(w)
 
-    return [
-        {"lat": float(r["latitude"]), "lon": float(r["longitude"]), "value": float(r["__w"])}
-        for _, r in df.iterrows()
-    ]
 
+def generate_heatmap_points(
+    full_df: pd.DataFrame,
+    state: str,
+    river_name: str,
+    weight: str = "juvenile_risk_prob",
+    index: Optional[GroupIndex] = None,
+) -> List[Dict[str, float]]:
+    """
+    Returns points for frontend heatmap layers (e.g., Leaflet.heat).
+
+    Output format: [{ "lat": <float>, "lon": <float>, "value": <float> }, ...]
+
+    - Filters by state + river_name (requires `river_name` column)
+    - `weight` can be:
+        - "juvenile_risk_prob" (default): derived from juvenile_risk_score
+        - "juvenile_risk_score": 0..6
+        - "chlorophyll_mg_m3": numeric
+        - "depth_m": numeric
+
+    Pass the `GroupIndex` built for `full_df` to avoid scanning every row.
+    """
+    lat, lon, value = generate_heatmap_arrays(full_df, state, river_name, weight, index)
+    with span("heatmap.points"):
+        return [
+            {"lat": a, "lon": b, "value": c}
+            for a, b, c in zip(lat.tolist(), lon.tolist(), value.tolist())
+        ]
 
-def _derive_risk_factors(row: pd.Series, zone: str) -> List[str]:
+
+def _derive_risk_factors(row: Mapping[str, Any], zone: str) -> List[str]:
     reasons: List[str] = []
     if row.get("juvenile_dominance", False):
         reasons.append("High proportion of juveniles below legal size.")
@@ -297,7 +782,7 @@ def _derive_risk_factors(row: pd.Series, zone: str) -> List[str]:
     return reasons
 
 
-def _recommend_gear(row: pd.Series, zone: str) -> str:
+def _recommend_gear(row: Mapping[str, Any], zone: str) -> str:
     if zone == "Red":
         return "Use highly selective gears such as hook-and-line or species/size-selective gillnets; avoid trawls and purse seines."
     if zone == "Yellow":
@@ -360,79 +845,127 @@ def _economic_note(economic_value: float, zone: str) -> str:
     )
 
 
-def generate_advisory_json(
+def score_zones(model: Pipeline, X: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Score a whole feature frame with a single `predict_proba` call.
+
+    Returns (zones, confidences): the argmax class per row (what `predict`
+    would return) and the probability assigned to that class.
+    """
+    proba = model.predict_proba(X)
+    best = proba.argmax(axis=1)
+    zones = np.asarray(model.classes_).take(best)
+    confidences = proba[np.arange(len(best)), best]
+    return zones, confidences
+
+
+def _build_advisories(
     model: Pipeline,
-    full_df: pd.DataFrame,
-    row_index: int,
-) -> Dict[str, Any]:
-    row = full_df.iloc[row_index]
-
-    # Rebuild feature row in the same way as training
-    feature_cols = [
-        "sea_surface_temp_C",
-        "chlorophyll_mg_m3",
-        "depth_m",
-        "min_legal_size_cm",
-        "juvenile_min_cm",
-        "juvenile_max_cm",
-        "juvenile_risk_score",
-        "economic_priority_score",
-        "state",
-        "water_type",
-        "season",
-        "gear_type",
+    frame: pd.DataFrame,
+    scores: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    stage: str = "advisories",
+) -> List[Dict[str, Any]]:
+    """
+    Batch version of `generate_advisory_json`: scores every row of `frame` at
+    once and assembles the advisory dicts from column arrays.
+
+    `scores` may carry precomputed (zones, confidences) for `frame` from
+    `score_zones`, in which case the model is not called. Spans are reported
+    as `<stage>.features`, `<stage>.predict` and `<stage>.text`.
+    """
+    if frame.empty:
+        return []
+
+    if scores is None:
+        with span(stage + ".features"):
+            X = frame[FEATURE_COLUMNS]
+        with span(stage + ".predict") as sp:
+            scores = score_zones(model, X)
+            sp.rows = len(X)
+    with span(stage + ".text"):
+        return _assemble_advisories(frame, scores)
+
+
+def _assemble_advisories(
+    frame: pd.DataFrame, scores: Tuple[np.ndarray, np.ndarray]
+) -> List[Dict[str, Any]]:
+    zones, confidences = scores
+    juvenile_probs = np.clip(
+        frame["juvenile_risk_score"].to_numpy(dtype=float) / 6.0, 0.0, 1.0
+    )
+
+    flag_cols = [
         "juvenile_dominance",
-        "disease_risk",
         "is_shallow",
         "high_chl",
         "is_monsoonish",
         "is_brackish",
         "non_selective_gear",
+        "disease_risk",
     ]
-    X_row = row[feature_cols].to_frame().T
-
-    zone_pred = model.predict(X_row)[0]
-    proba = model.predict_proba(X_row)[0]
-    class_index = list(model.named_steps["clf"].classes_).index(zone_pred)
-    zone_confidence = float(proba[class_index])
-
-    juvenile_prob = _juvenile_risk_probability(row)
-    risk_factors = _derive_risk_factors(row, zone_pred)
-    advisory = _advisory_text(zone_pred, juvenile_prob)
-    gear_rec = _recommend_gear(row, zone_pred)
-    econ_note = _economic_note(row["economic_value_in_INR_per_kg"], zone_pred)
-
-    output = AdvisoryOutput(
-        species=row["scientific_name"],
-        latitude=float(row["latitude"]),
-        longitude=float(row["longitude"]),
-        zone=zone_pred,
-        risk_factors=risk_factors
-        + [f"Model confidence for {zone_pred} zone: {zone_confidence:.2f}"],
-        fishing_advisory=advisory,
-        recommended_gear=gear_rec,
-        economic_note=econ_note,
+    flags = {col: frame[col].to_numpy(dtype=bool).tolist() for col in flag_cols}
+    diseases = frame["seasonal_disease"].tolist()
+    species = frame["scientific_name"].tolist()
+    latitudes = frame["latitude"].to_numpy(dtype=float).tolist()
+    longitudes = frame["longitude"].to_numpy(dtype=float).tolist()
+    economic_values = frame["economic_value_in_INR_per_kg"].tolist()
+    n = len(frame)
+    dataset_texts = (
+        frame["advisory_text"].tolist() if "advisory_text" in frame.columns else [None] * n
     )
-    out = asdict(output)
-    # If the new dataset includes pre-written advisory text, expose it for downstream use.
-    if "advisory_text" in full_df.columns and pd.notna(row.get("advisory_text")):
-        out["dataset_advisory_text"] = str(row.get("advisory_text"))
-    # If river_name exists in dataset, expose it here too.
-    if "river_name" in full_df.columns and pd.notna(row.get("river_name")):
-        out["river_name"] = str(row.get("river_name"))
-    return out
+    river_names = frame["river_name"].tolist() if "river_name" in frame.columns else [None] * n
 
+    advisories: List[Dict[str, Any]] = []
+    for i in range(n):
+        zone = str(zones[i])
+        zone_confidence = float(confidences[i])
+        row = {col: flags[col][i] for col in flag_cols}
+        row["seasonal_disease"] = diseases[i]
+
+        output = AdvisoryOutput(
+            species=species[i],
+            latitude=latitudes[i],
+            longitude=longitudes[i],
+            zone=zone,
+            risk_factors=_derive_risk_factors(row, zone)
+            + [f"Model confidence for {zone} zone: {zone_confidence:.2f}"],
+            fishing_advisory=_advisory_text(zone, float(juvenile_probs[i])),
+            recommended_gear=_recommend_gear(row, zone),
+            economic_note=_economic_note(economic_values[i], zone),
+        )
+        out = asdict(output)
+        # If the new dataset includes pre-written advisory text, expose it for downstream use.
+        if pd.notna(dataset_texts[i]):
+            out["dataset_advisory_text"] = str(dataset_texts[i])
+        # If river_name exists in dataset, expose it here too.
+        if pd.notna(river_names[i]):
+            out["river_name"] = str(river_names[i])
+        advisories.append(out)
+    return advisories
 
-def generate_advisories_for_state(
+
+def generate_advisory_json(
+    model: Pipeline,
+    full_df: pd.DataFrame,
+    row_index: int,
+) -> Dict[str, Any]:
+    return _build_advisories(model, full_df.iloc[[row_index]])[0]
+
+
+def iter_advisories_for_state(
     model: Pipeline,
     full_df: pd.DataFrame,
     state: str,
     river_name: str,
-) -> List[Dict[str, Any]]:
+    index: Optional[GroupIndex] = None,
+    chunk_size: Optional[int] = 500,
+) -> Iterator[Dict[str, Any]]:
     """
-    Filter records by state AND river_name, then return advisory JSON for each matching row.
+    Generator version of `generate_advisories_for_state`.
 
-    Note: `river_name` is now a real column in the updated dataset (e.g., `converted_final.csv`).
+    Rows are scored `chunk_size` at a time (all at once for None) and each
+    advisory is yielded as soon as its chunk is done, so callers can stream
+    results without holding the whole list.
     """
     if "river_name" not in full_df.columns:
         raise ValueError(
@@ -440,20 +973,263 @@ def generate_advisories_for_state(
             "Please use the updated CSV (e.g., converted_final.csv)."
         )
 
-    mask = (full_df["state"].str.lower() == state.lower()) & (
-        full_df["river_name"].astype(str).str.lower() == river_name.lower()
+    with span("advisories.select") as sp:
+        subset = _select_pair(full_df, state, river_name, index).reset_index(drop=True)
+        sp.rows = len(subset)
+    step = chunk_size or max(len(subset), 1)
+    for start in range(0, len(subset), step):
+        chunk = subset.iloc[start:start + step]
+        advisories = _build_advisories(model, chunk)
+        # Ensure river_name is present in response (comes from dataset)
+        for row_json, river in zip(advisories, chunk["river_name"].tolist()):
+            row_json["river_name"] = str(river)
+            yield row_json
+
+
+def generate_advisories_for_state(
+    model: Pipeline,
+    full_df: pd.DataFrame,
+    state: str,
+    river_name: str,
+    index: Optional[GroupIndex] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Filter records by state AND river_name, then return advisory JSON for each matching row.
+
+    Pass the `GroupIndex` built for `full_df` to avoid scanning every row.
+
+    All matching rows are scored in one batch (a single `predict_proba` call),
+    so latency scales with one model pass rather than one per row.
+
+    Note: `river_name` is now a real column in the updated dataset (e.g., `converted_final.csv`).
+    """
+    return list(
+        iter_advisories_for_state(model, full_df, state, river_name, index, chunk_size=None)
     )
-    subset = full_df[mask].reset_index(drop=True)
 
-    advisories: List[Dict[str, Any]] = []
-    for i in range(len(subset)):
-        row_json = generate_advisory_json(model, subset, i)
-        # Ensure river_name is present in response (comes from dataset)
-        row_json["river_name"] = str(subset.iloc[i]["river_name"])
-        advisories.append(row_json)
+
+def advisories_for_rows(
+    model: Pipeline,
+    full_df: pd.DataFrame,
+    positions: np.ndarray,
+    scores: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Advisories for the rows of `full_df` at `positions` (e.g. one `GroupIndex`
+    entry), as `generate_advisories_for_state` returns them.
+
+    `scores` may carry precomputed (zones, confidences) for every row of
+    `full_df`, in which case the model is not called.
+    """
+    frame = full_df.iloc[positions]
+    if scores is not None:
+        scores = (scores[0][positions], scores[1][positions])
+    advisories = _build_advisories(model, frame, scores)
+    for row_json, river in zip(advisories, frame["river_name"].astype(str).tolist()):
+        row_json["river_name"] = river
     return advisories
 
 
+def prepare_observations(records: pd.DataFrame, transformer: FeatureTransformer) -> pd.DataFrame:
+    """
+    Validate raw observations and apply the fitted feature engineering.
+
+    Dataset-wide features (economic priority rank, median fills) come from
+    the statistics `transformer` learned on the training data, not from the
+    batch itself.
+    """
+    missing = [c for c in OBSERVATION_REQUIRED_COLUMNS if c not in records.columns]
+    if missing:
+        raise ValueError(f"Observations are missing required columns: {', '.join(missing)}")
+
+    df = records.copy()
+    for col in OBSERVATION_OPTIONAL_COLUMNS:
+        if col not in df.columns:
+            df[col] = np.nan
+    for col in OBSERVATION_NUMERIC_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    return transformer.transform(df, copy=False)
+
+
+def score_observations(
+    model: Pipeline,
+    records: pd.DataFrame,
+    transformer: FeatureTransformer,
+    chunk_size: int = 50_000,
+) -> pd.DataFrame:
+    """
+    Score new observations in vectorized chunks.
+
+    Returns a frame aligned with `records` holding `zone`, `zone_confidence`
+    and `juvenile_risk_score`.
+    """
+    parts = []
+    for start in range(0, len(records), chunk_size):
+        chunk = prepare_observations(records.iloc[start:start + chunk_size], transformer)
+        zones, confidences = score_zones(model, chunk[FEATURE_COLUMNS])
+        parts.append(
+            pd.DataFrame(
+                {
+                    "zone": zones,
+                    "zone_confidence": confidences,
+                    "juvenile_risk_score": chunk["juvenile_risk_score"].to_numpy(),
+                }
+            )
+        )
+    if not parts:
+        return pd.DataFrame(
+            {"zone": pd.Series(dtype=object), "zone_confidence": [], "juvenile_risk_score": []}
+        )
+    return pd.concat(parts, ignore_index=True)
+
+
+def _deep_sizeof(obj: Any) -> int:
+    """Approximate memory held by nested dicts/lists/strings, counting shared objects once."""
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        o = stack.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o)
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple)):
+            stack.extend(o)
+    return total
+
+
+@dataclass
+class AdvisoryView:
+    """
+    Precomputed advisories for every row of a dataset.
+
+    `rows[i]` is the advisory for positional row `i` of the frame the view was
+    built from; `groups` maps a lower-cased (state, river_name) key to the row
+    positions of that pair, in dataset order. The advisory dicts are shared
+    between lookups and must not be mutated by callers; use `rows_at` rather
+    than `rows` directly, since a lazy view (`build_advisory_view(lazy=True)`)
+    holds None for rows no lookup has needed yet.
+    """
+
+    rows: List[Optional[Dict[str, Any]]]
+    groups: Dict[Tuple[str, str], Any]
+    build_seconds: float = 0.0
+    size_bytes: int = 0
+    # Lazy views: builds the advisories for the given row positions
+    materialize: Optional[Callable[[np.ndarray], List[Dict[str, Any]]]] = field(
+        default=None, repr=False
+    )
+    rows_built: int = 0
+    # Lazy views: the groups every row of which has been built
+    built_groups: Set[Tuple[str, str]] = field(default_factory=set, repr=False)
+
+    def is_ready(self, state: str, river_name: str) -> bool:
+        """True if looking the pair up needs no advisories to be built."""
+        key = (state.lower(), river_name.lower())
+        return self.materialize is None or key in self.built_groups or key not in self.groups
+
+    def rows_ready(self, positions: List[int]) -> bool:
+        """True if `rows_at(positions)` needs no advisories to be built."""
+        return self.materialize is None or all(self.rows[i] is not None for i in positions)
+
+    def rows_at(self, positions: List[int]) -> List[Dict[str, Any]]:
+        if self.materialize is not None:
+            missing = [i for i in positions if self.rows[i] is None]
+            if missing:
+                # Concurrent lookups may build the same rows twice; both results are equal
+                for i, row in zip(missing, self.materialize(np.asarray(missing, dtype=np.intp))):
+                    self.rows[i] = row
+                self.rows_built += len(missing)
+        return [self.rows[i] for i in positions]
+
+    def _positions(self, state: str, river_name: str) -> List[int]:
+        positions = self.groups.get((state.lower(), river_name.lower()), [])
+        return positions.tolist() if isinstance(positions, np.ndarray) else positions
+
+    def lookup(self, state: str, river_name: str) -> List[Dict[str, Any]]:
+        rows = self.rows_at(self._positions(state, river_name))
+        if self.materialize is not None:
+            self.built_groups.add((state.lower(), river_name.lower()))
+        return rows
+
+    def count(self, state: str, river_name: str) -> int:
+        return len(self.groups.get((state.lower(), river_name.lower()), []))
+
+    def iter_lookup(
+        self, state: str, river_name: str, batch_size: int = 256
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the pair's advisories in dataset order. A lazy view builds them
+        `batch_size` rows at a time as the iteration gets to them.
+        """
+        key = (state.lower(), river_name.lower())
+        positions = self._positions(state, river_name)
+        for start in range(0, len(positions), batch_size):
+            yield from self.rows_at(positions[start:start + batch_size])
+        if self.materialize is not None and positions:
+            self.built_groups.add(key)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "rows": len(self.rows),
+            "groups": len(self.groups),
+            "build_seconds": round(self.build_seconds, 4),
+            "size_bytes": self.size_bytes,
+            "lazy": self.materialize is not None,
+            "rows_built": self.rows_built if self.materialize is not None else len(self.rows),
+        }
+
+
+def build_advisory_view(
+    model: Pipeline,
+    full_df: pd.DataFrame,
+    index: Optional[GroupIndex] = None,
+    scores: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    lazy: bool = False,
+) -> AdvisoryView:
+    """
+    Score every row of `full_df` once and group the resulting advisories by
+    lower-cased (state, river_name), so that a state/river query is a lookup.
+
+    Each group matches what `generate_advisories_for_state` returns for it.
+    Precomputed (zones, confidences) for every row can be passed as `scores`.
+
+    With `lazy=True` nothing is built up front: each row's advisory is built
+    (with `advisories_for_rows`) the first time a lookup needs it, and the
+    group positions stay the index's arrays. Meant for API workers mapping
+    the shared state, which already holds the scores.
+    """
+    start = time.perf_counter()
+    if index is None:
+        index = build_group_index(full_df)
+
+    if lazy:
+        rows: List[Optional[Dict[str, Any]]] = [None] * len(full_df)
+        return AdvisoryView(
+            rows=rows,
+            groups=dict(index.positions),
+            build_seconds=time.perf_counter() - start,
+            size_bytes=sys.getsizeof(rows),
+            materialize=lambda positions: advisories_for_rows(model, full_df, positions, scores),
+        )
+
+    rows = _build_advisories(model, full_df, scores, stage="advisory_view")
+    for row_json, river in zip(rows, full_df["river_name"].astype(str).tolist()):
+        row_json["river_name"] = river
+    groups = {key: pos.tolist() for key, pos in index.positions.items()}
+
+    return AdvisoryView(
+        rows=rows,
+        groups=groups,
+        build_seconds=time.perf_counter() - start,
+        size_bytes=_deep_sizeof(rows) + _deep_sizeof(groups),
+    )
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Species-wise juvenile fish density and advisory generator"
@@ -476,15 +1252,51 @@ def main():
         required=True,
         help="River/estuary name label for the query.",
     )
+    parser.add_argument(
+        "--ndjson",
+        action="store_true",
+        help="Stream advisories as newline-delimited JSON instead of one JSON list.",
+    )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        default=None,
+        metavar="STATS_PATH",
+        help="Profile the run with cProfile: write the stats to STATS_PATH "
+        "(for pstats or snakeviz) and print the top functions to stderr.",
+    )
 
     args = parser.parse_args()
 
+    if args.profile:
+        import cProfile
+        import pstats
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.runcall(_run, args)
+        finally:
+            profiler.dump_stats(args.profile)
+            stats = pstats.Stats(profiler, stream=sys.stderr)
+            stats.sort_stats("cumulative").print_stats(25)
+        return
+    _run(args)
+
+
+def _run(args: argparse.Namespace) -> None:
     X, y, pre, df_full = load_and_preprocess(args.data_path)
     model, eval_results = train_zone_classifier(X, y, pre)
 
     # Print basic evaluation summary (you can remove this in production)
     print(f"Model accuracy: {eval_results['accuracy']:.3f}")
 
+    if args.ndjson:
+        for advisory in iter_advisories_for_state(
+            model, df_full, args.state, args.river_name
+        ):
+            print(json.dumps(advisory, ensure_ascii=False))
+        return
+
     advisories = generate_advisories_for_state(
         model=model,
         full_df=df_full,
@@ -498,5 +1310,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
-
@@ -0,0 +1,341 @@
+"""
+Flat NumPy evaluator for the fitted zone classifier.
+
+`compile_pipeline` exports the fitted preprocessing (scaler means/scales,
+one-hot category tables, passthrough booleans) and every tree of the
+RandomForest into a handful of packed arrays. `CompiledForest.predict_proba`
+then evaluates all trees for a batch with vectorized NumPy indexing,
+reproducing the sklearn `Pipeline` output without its per-call overhead
+(input validation, ColumnTransformer dispatch, joblib threads).
+
+The arrays can be saved as `.npy` files and memory-mapped back, so several
+processes can share one copy of the forest.
+
+Latency/parity comparison against the sklearn pipeline:
+
+    python -m ML.forest_compiler --data-path converted_final.csv
+"""
+
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder, StandardScaler
+
+
+_ARRAY_NAMES = (
+    "scaler_mean",
+    "scaler_scale",
+    "feature",
+    "threshold",
+    "left",
+    "missing_left",
+    "value",
+    "roots",
+)
+
+# Rows evaluated per traversal pass; bounds the (rows x trees) working set
+_CHUNK_ROWS = 1024
+
+
+class CompiledForest:
+    """
+    Pure-NumPy equivalent of a fitted `Pipeline(pre=ColumnTransformer, clf=RandomForestClassifier)`.
+
+    Exposes the subset of the estimator API the advisory code uses:
+    `classes_`, `predict_proba` and `predict`.
+    """
+
+    def __init__(
+        self,
+        arrays: Dict[str, np.ndarray],
+        numeric_cols: List[str],
+        categorical_cols: List[str],
+        categories: List[List[str]],
+        passthrough_cols: List[str],
+        classes: List[str],
+        max_depth: int,
+    ):
+        self.arrays = arrays
+        self.numeric_cols = numeric_cols
+        self.categorical_cols = categorical_cols
+        self.categories = categories
+        self.passthrough_cols = passthrough_cols
+        self.classes_ = np.asarray(classes, dtype=object)
+        self.max_depth = max_depth
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.arrays["roots"])
+
+    def transform(self, X: pd.DataFrame) -> np.ndarray:
+        """Preprocess `X` into the float32 design matrix the trees were fit on."""
+        blocks = []
+        if self.numeric_cols:
+            num = X[self.numeric_cols].to_numpy(dtype=np.float64)
+            blocks.append((num - self.arrays["scaler_mean"]) / self.arrays["scaler_scale"])
+        for col, cats in zip(self.categorical_cols, self.categories):
+            codes = pd.Index(cats).get_indexer(X[col].astype(object))
+            onehot = np.zeros((len(X), len(cats)), dtype=np.float64)
+            known = codes >= 0
+            # Unknown categories stay all-zero, like OneHotEncoder(handle_unknown="ignore")
+            onehot[np.flatnonzero(known), codes[known]] = 1.0
+            blocks.append(onehot)
+        if self.passthrough_cols:
+            blocks.append(X[self.passthrough_cols].to_numpy(dtype=np.float64))
+        # The forest compares float32 features against float64 thresholds
+        return np.hstack(blocks).astype(np.float32)
+
+    def _predict_proba_matrix(self, Xt: np.ndarray) -> np.ndarray:
+        a = self.arrays
+        n_rows, n_features = Xt.shape
+        n_trees = self.n_trees
+        x_flat = Xt.ravel()
+
+        # One cursor per (row, tree), row-major; only cursors not yet at a leaf are advanced
+        node = np.tile(np.asarray(a["roots"], dtype=np.intp), n_rows)
+        row_offset = np.repeat(np.arange(n_rows, dtype=np.intp) * n_features, n_trees)
+        active = np.arange(node.size, dtype=np.intp)
+        current = node
+        for _ in range(self.max_depth + 1):
+            feature = a["feature"][current]
+            internal = feature >= 0  # leaves are marked with feature -1
+            active = active[internal]
+            if active.size == 0:
+                break
+            current = current[internal]
+            x = x_flat[row_offset[active] + feature[internal]]
+            go_right = ~(x <= a["threshold"][current])
+            nan = np.isnan(x)
+            if nan.any():
+                go_right[nan] = ~a["missing_left"][current[nan]]
+            # Children are stored adjacently: right == left + 1
+            current = a["left"][current] + go_right
+            node[active] = current
+
+        # Accumulate tree by tree, in estimator order, like RandomForestClassifier
+        node = node.reshape(n_rows, n_trees)
+        values = a["value"]
+        proba = np.zeros((n_rows, values.shape[1]), dtype=np.float64)
+        for t in range(n_trees):
+            proba += values[node[:, t]]
+        proba /= n_trees
+        return proba
+
+    def predict_proba(self, X: pd.DataFrame) -> np.ndarray:
+        Xt = self.transform(X)
+        if len(Xt) <= _CHUNK_ROWS:
+            return self._predict_proba_matrix(Xt)
+        return np.vstack(
+            [
+                self._predict_proba_matrix(Xt[i:i + _CHUNK_ROWS])
+                for i in range(0, len(Xt), _CHUNK_ROWS)
+            ]
+        )
+
+    def predict(self, X: pd.DataFrame) -> np.ndarray:
+        return self.classes_.take(self.predict_proba(X).argmax(axis=1))
+
+    def save(self, out_dir: str) -> None:
+        """Write the packed arrays as .npy files plus a JSON spec."""
+        path = Path(out_dir)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in _ARRAY_NAMES:
+            tmp = path / f"{name}.npy.tmp"
+            with open(tmp, "wb") as fh:
+                np.save(fh, np.ascontiguousarray(self.arrays[name]))
+            os.replace(tmp, path / f"{name}.npy")
+        spec = {
+            "numeric_cols": self.numeric_cols,
+            "categorical_cols": self.categorical_cols,
+            "categories": self.categories,
+            "passthrough_cols": self.passthrough_cols,
+            "classes": [str(c) for c in self.classes_],
+            "max_depth": self.max_depth,
+        }
+        tmp = path / "forest.json.tmp"
+        tmp.write_text(json.dumps(spec), encoding="utf-8")
+        os.replace(tmp, path / "forest.json")
+
+    @classmethod
+    def load(cls, in_dir: str, mmap_mode: Optional[str] = "r") -> "CompiledForest":
+        """Load a saved forest; with `mmap_mode="r"` the arrays are shared read-only pages."""
+        path = Path(in_dir)
+        spec = json.loads((path / "forest.json").read_text(encoding="utf-8"))
+        arrays = {name: np.load(path / f"{name}.npy", mmap_mode=mmap_mode) for name in _ARRAY_NAMES}
+        return cls(
+            arrays=arrays,
+            numeric_cols=spec["numeric_cols"],
+            categorical_cols=spec["categorical_cols"],
+            categories=spec["categories"],
+            passthrough_cols=spec["passthrough_cols"],
+            classes=spec["classes"],
+            max_depth=spec["max_depth"],
+        )
+
+
+def _sibling_order(children_left: np.ndarray, children_right: np.ndarray) -> np.ndarray:
+    """
+    Breadth-first node order in which the two children of every split are
+    adjacent, so a traversal step is `left[node] + went_right`.
+    """
+    order = [0]
+    head = 0
+    while head < len(order):
+        node = order[head]
+        head += 1
+        if children_left[node] >= 0:
+            order.append(children_left[node])
+            order.append(children_right[node])
+    return np.asarray(order, dtype=np.intp)
+
+
+def compile_pipeline(model: Pipeline) -> CompiledForest:
+    """Flatten a fitted preprocessing + RandomForest pipeline into a `CompiledForest`."""
+    pre = model.named_steps["pre"]
+    clf = model.named_steps["clf"]
+    if not isinstance(pre, ColumnTransformer) or not isinstance(clf, RandomForestClassifier):
+        raise TypeError("Expected Pipeline(pre=ColumnTransformer, clf=RandomForestClassifier).")
+
+    numeric_cols: List[str] = []
+    categorical_cols: List[str] = []
+    categories: List[List[str]] = []
+    passthrough_cols: List[str] = []
+    scaler_mean = np.empty(0)
+    scaler_scale = np.empty(0)
+    # The compiled layout is always num | cat | passthrough; check the fitted one matches
+    expected_order = []
+    for name, trans, cols in pre.transformers_:
+        if trans == "drop" or len(cols) == 0:
+            continue
+        if isinstance(trans, StandardScaler):
+            if numeric_cols:
+                raise TypeError("Only one StandardScaler block is supported.")
+            numeric_cols = list(cols)
+            scaler_mean = np.asarray(
+                trans.mean_ if trans.with_mean else np.zeros(len(cols)), dtype=np.float64
+            )
+            scaler_scale = np.asarray(
+                trans.scale_ if trans.with_std else np.ones(len(cols)), dtype=np.float64
+            )
+            expected_order.append("num")
+        elif isinstance(trans, OneHotEncoder):
+            if trans.drop is not None or trans.handle_unknown != "ignore":
+                raise TypeError("Only OneHotEncoder(handle_unknown='ignore') without drop is supported.")
+            categorical_cols = list(cols)
+            categories = [[c for c in cats.tolist()] for cats in trans.categories_]
+            expected_order.append("cat")
+        elif trans == "passthrough" or (isinstance(trans, FunctionTransformer) and trans.func is None):
+            passthrough_cols = list(cols)
+            expected_order.append("bool")
+        else:
+            raise TypeError(f"Unsupported transformer in pipeline: {name}={trans!r}")
+    if expected_order != sorted(expected_order, key=["num", "cat", "bool"].index):
+        raise TypeError("Transformer blocks must be ordered numeric, categorical, passthrough.")
+
+    features, thresholds, lefts, missing, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for est in clf.estimators_:
+        tree = est.tree_
+        order = _sibling_order(tree.children_left, tree.children_right)
+        # new_id[old] = position of node `old` in the relabelled tree
+        new_id = np.empty_like(order)
+        new_id[order] = np.arange(len(order))
+
+        children_left = tree.children_left[order]
+        is_leaf = children_left < 0
+        lefts.append(np.where(is_leaf, -1, new_id[children_left] + offset))
+        features.append(np.where(is_leaf, -1, tree.feature[order]))
+        thresholds.append(tree.threshold[order])
+        missing.append(
+            np.asarray(getattr(tree, "missing_go_to_left", np.zeros(len(order))), dtype=bool)[order]
+        )
+        # Same normalization DecisionTreeClassifier.predict_proba applies per row
+        leaf_value = tree.value[order, 0, :].astype(np.float64)
+        normalizer = leaf_value.sum(axis=1)[:, None]
+        normalizer[normalizer == 0.0] = 1.0
+        values.append(leaf_value / normalizer)
+        roots.append(offset)
+        offset += len(order)
+        max_depth = max(max_depth, tree.max_depth)
+
+    arrays = {
+        "scaler_mean": scaler_mean,
+        "scaler_scale": scaler_scale,
+        "feature": np.concatenate(features).astype(np.int32),
+        "threshold": np.concatenate(thresholds).astype(np.float64),
+        "left": np.concatenate(lefts).astype(np.intp),
+        "missing_left": np.concatenate(missing),
+        "value": np.concatenate(values),
+        "roots": np.asarray(roots, dtype=np.int32),
+    }
+    return CompiledForest(
+        arrays=arrays,
+        numeric_cols=numeric_cols,
+        categorical_cols=categorical_cols,
+        categories=categories,
+        passthrough_cols=passthrough_cols,
+        classes=[str(c) for c in clf.classes_],
+        max_depth=max_depth,
+    )
+
+
+def _time_call(fn, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def compare_backends(model: Pipeline, X: pd.DataFrame, batch_sizes: List[int], repeats: int = 5) -> List[Dict[str, Any]]:
+    """Parity and best-of-N latency of the sklearn pipeline vs. the compiled forest."""
+    compiled = compile_pipeline(model)
+    results = []
+    for size in batch_sizes:
+        batch = X.iloc[:size]
+        expected = model.predict_proba(batch)
+        got = compiled.predict_proba(batch)
+        results.append(
+            {
+                "batch_size": len(batch),
+                "max_abs_diff": float(np.abs(expected - got).max()),
+                "same_argmax": bool((expected.argmax(axis=1) == got.argmax(axis=1)).all()),
+                "sklearn_ms": 1000 * _time_call(lambda: model.predict_proba(batch), repeats),
+                "numpy_ms": 1000 * _time_call(lambda: compiled.predict_proba(batch), repeats),
+            }
+        )
+    return results
+
+
+def main():
+    from ML.fish_advisory_pipeline import load_and_preprocess, train_zone_classifier
+
+    parser = argparse.ArgumentParser(description="Compare sklearn and compiled NumPy forest inference")
+    parser.add_argument("--data-path", type=str, required=True, help="Path to the fisheries CSV dataset.")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    X, y, pre, _ = load_and_preprocess(args.data_path)
+    model, _ = train_zone_classifier(X, y, pre)
+    for r in compare_backends(model, X, args.batch_sizes, args.repeats):
+        print(
+            f"batch={r['batch_size']:>6}  sklearn={r['sklearn_ms']:8.2f} ms  "
+            f"numpy={r['numpy_ms']:8.2f} ms  speedup={r['sklearn_ms'] / r['numpy_ms']:5.1f}x  "
+            f"max|diff|={r['max_abs_diff']:.1e}  same_argmax={r['same_argmax']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
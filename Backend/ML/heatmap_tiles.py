@@ -0,0 +1,194 @@
+"""
+Server-side spatial aggregation of heatmap points into slippy-map tiles.
+
+Instead of one point per record, a `TilePyramid` bins the points of one
+(state, river, weight) query into a fixed grid of cells inside every Web
+Mercator tile (z/x/y, as used by Leaflet/OSM) and aggregates the weights per
+cell (mean, max, count). Zoom levels are built on first use and kept, so a
+tile request is a slice of precomputed arrays and the client only downloads
+the cells of tiles it actually shows.
+"""
+
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+
+# Web Mercator is undefined at the poles; clamp like slippy-map tile servers do
+MAX_LATITUDE = 85.05112878
+MAX_ZOOM = 18
+AGGREGATIONS = ("mean", "max", "count")
+
+
+@dataclass
+class TileLevel:
+    """Aggregated cells for one zoom level, sorted so that each tile is a contiguous slice."""
+
+    tiles: Dict[Tuple[int, int], Tuple[int, int]]
+    lat: np.ndarray
+    lon: np.ndarray
+    count: np.ndarray
+    mean: np.ndarray
+    max: np.ndarray
+    max_count: int
+
+
+def _mercator_fractions(lat: np.ndarray, lon: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Map lat/lon to [0, 1) x/y fractions of the Web Mercator world square."""
+    lat_rad = np.radians(np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE))
+    x = (lon + 180.0) / 360.0
+    y = (1.0 - np.arcsinh(np.tan(lat_rad)) / math.pi) / 2.0
+    upper = np.nextafter(1.0, 0.0)
+    return np.clip(x, 0.0, upper), np.clip(y, 0.0, upper)
+
+
+class TilePyramid:
+    """
+    Per-zoom cell aggregates for one set of heatmap points.
+
+    Each tile is split into `cells_per_tile` x `cells_per_tile` cells; a cell
+    reports the centroid of its points, their count, and the mean and max of
+    their (already 0..1 normalized) weights.
+    """
+
+    def __init__(
+        self,
+        lat: np.ndarray,
+        lon: np.ndarray,
+        value: np.ndarray,
+        cells_per_tile: int = 32,
+    ):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.cells_per_tile = cells_per_tile
+        self._x, self._y = _mercator_fractions(self.lat, self.lon)
+        self._levels: Dict[int, TileLevel] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def n_points(self) -> int:
+        return len(self.value)
+
+    def level(self, z: int) -> TileLevel:
+        with self._lock:
+            lvl = self._levels.get(z)
+            if lvl is None:
+                lvl = self._build_level(z)
+                self._levels[z] = lvl
+            return lvl
+
+    def _build_level(self, z: int) -> TileLevel:
+        g = self.cells_per_tile
+        cells_across = (1 << z) * g
+        cx = (self._x * cells_across).astype(np.int64)
+        cy = (self._y * cells_across).astype(np.int64)
+        # Order cells by tile first (tile y, tile x), then by cell within the tile
+        ty, tx = cy // g, cx // g
+        key = ((ty * (1 << z) + tx) * g + cy % g) * g + cx % g
+
+        order = np.argsort(key, kind="stable")
+        key_sorted = key[order]
+        starts = np.flatnonzero(np.r_[True, key_sorted[1:] != key_sorted[:-1]])
+        if len(key_sorted) == 0:
+            empty = np.empty(0, dtype=np.float64)
+            return TileLevel({}, empty, empty, np.empty(0, dtype=np.int64), empty, empty, 0)
+
+        count = np.diff(np.r_[starts, len(key_sorted)])
+        v = self.value[order]
+        mean = np.add.reduceat(v, starts) / count
+        vmax = np.maximum.reduceat(v, starts)
+        lat = np.add.reduceat(self.lat[order], starts) / count
+        lon = np.add.reduceat(self.lon[order], starts) / count
+
+        tile_ids = key_sorted[starts] // (g * g)
+        tile_starts = np.flatnonzero(np.r_[True, tile_ids[1:] != tile_ids[:-1]])
+        tile_stops = np.r_[tile_starts[1:], len(tile_ids)]
+        n_tiles = 1 << z
+        tiles = {
+            (int(t % n_tiles), int(t // n_tiles)): (int(a), int(b))
+            for t, a, b in zip(tile_ids[tile_starts], tile_starts, tile_stops)
+        }
+        return TileLevel(tiles, lat, lon, count, mean, vmax, int(count.max()))
+
+    def tile(self, z: int, x: int, y: int, agg: str = "mean") -> List[Dict[str, float]]:
+        """
+        Cells of tile z/x/y as [{"lat", "lon", "value", "count"}, ...].
+
+        `value` is the cell's mean or max weight, or for agg="count" its point
+        count relative to the busiest cell at this zoom level (0..1).
+        """
+        if agg not in AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation: {agg} (expected one of {', '.join(AGGREGATIONS)})")
+        lvl = self.level(z)
+        span = lvl.tiles.get((x, y))
+        if span is None:
+            return []
+        a, b = span
+        if agg == "mean":
+            values = lvl.mean[a:b]
+        elif agg == "max":
+            values = lvl.max[a:b]
+        else:
+            values = lvl.count[a:b] / lvl.max_count
+        return [
+            {"lat": la, "lon": lo, "value": v, "count": c}
+            for la, lo, v, c in zip(
+                lvl.lat[a:b].tolist(),
+                lvl.lon[a:b].tolist(),
+                values.tolist(),
+                lvl.count[a:b].tolist(),
+            )
+        ]
+
+
+class TilePyramidCache:
+    """Thread-safe LRU of `TilePyramid`s keyed by e.g. (state, river, weight)."""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, TilePyramid]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key: Hashable, build: Callable[[], TilePyramid]) -> TilePyramid:
+        with self._lock:
+            pyramid = self._entries.get(key)
+            if pyramid is not None:
+                self._entries.move_to_end(key)
+                return pyramid
+        pyramid = build()
+        with self._lock:
+            # Another thread may have built it meanwhile; keep the first one
+            pyramid = self._entries.setdefault(key, pyramid)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return pyramid
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def tile_bounds(z: int, x: int, y: int) -> Optional[Dict[str, Any]]:
+    """Lat/lon bounds of tile z/x/y, or None if the tile does not exist."""
+    n = 1 << z
+    if not (0 <= z <= MAX_ZOOM and 0 <= x < n and 0 <= y < n):
+        return None
+
+    def lat_at(ty: float) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * ty / n))))
+
+    return {
+        "west": x / n * 360.0 - 180.0,
+        "east": (x + 1) / n * 360.0 - 180.0,
+        "north": lat_at(y),
+        "south": lat_at(y + 1),
+    }
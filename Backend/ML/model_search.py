@@ -0,0 +1,341 @@
+"""
+Hyperparameter search for the zone classifier.
+
+`train_zone_classifier` fits a fixed 300-tree forest with unlimited depth by
+default. This module searches forest depth and leaf size, each configuration
+in its own worker process, and grows every forest in steps (`warm_start`
+adds trees without refitting the existing ones). A configuration stops early
+once another step no longer improves held-out accuracy. Every
+(configuration, tree count) is a candidate, and the smallest candidate whose
+accuracy is within `tolerance` of the best is chosen.
+
+Models are evaluated on the same held-out split as `train_zone_classifier`
+(`holdout_split`). Each configuration's results are cached on disk under the
+data fingerprint and the search settings, so a rerun only fits what is
+missing. For every candidate the report lists training time, pickled model
+size and per-row inference latency (`predict_proba` on the held-out rows,
+after the column transformer).
+
+    python -m ML.model_search --data-path converted_final.csv --workers 4
+
+By default the chosen model is then trained and saved as the model artifact
+`load_or_train` (and so the API) loads for that dataset.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from ML.fish_advisory_pipeline import (
+    DEFAULT_FOREST_PARAMS,
+    ZONE_CLASS_WEIGHTS,
+    FeatureTransformer,
+    build_preprocessor,
+    holdout_split,
+    load_and_preprocess,
+    train_zone_classifier,
+)
+from ML.model_store import data_fingerprint, save_model
+
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+# Bump when the way candidates are fitted or measured changes (invalidates the cache)
+SEARCH_VERSION = 1
+
+
+@dataclass
+class SearchSpace:
+    max_depths: Tuple[Optional[int], ...] = (None, 24, 16, 12, 8)
+    min_samples_leafs: Tuple[int, ...] = (1, 2, 4, 8)
+    # Forest sizes each configuration is grown through
+    tree_steps: Tuple[int, ...] = (25, 50, 100, 150, 200, 300)
+    # Stop growing after this many steps without `min_delta` accuracy gain
+    patience: int = 2
+    min_delta: float = 0.001
+    fixed_params: Dict[str, Any] = field(
+        default_factory=lambda: {"min_samples_split": DEFAULT_FOREST_PARAMS["min_samples_split"]}
+    )
+
+    def configs(self) -> List[Dict[str, Any]]:
+        return [
+            {"max_depth": depth, "min_samples_leaf": leaf}
+            for depth in self.max_depths
+            for leaf in self.min_samples_leafs
+        ]
+
+
+def _config_id(config: Dict[str, Any]) -> str:
+    depth = "none" if config["max_depth"] is None else config["max_depth"]
+    return f"depth-{depth}_leaf-{config['min_samples_leaf']}"
+
+
+def cache_key(fingerprint: Dict[str, Any], space: SearchSpace, random_state: int) -> str:
+    """Cache directory name for results on this data with these search settings."""
+    key = {
+        "search_version": SEARCH_VERSION,
+        # The file's location does not change the results
+        "data": {k: v for k, v in fingerprint.items() if k != "path"},
+        "tree_steps": list(space.tree_steps),
+        "patience": space.patience,
+        "min_delta": space.min_delta,
+        "fixed_params": space.fixed_params,
+        "class_weights": ZONE_CLASS_WEIGHTS,
+        "random_state": random_state,
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+# (X_train, X_test, y_train, y_test) after the column transformer; set in each
+# pool worker by _init_worker (and in the parent when searching in-process)
+_split: Optional[Tuple[Any, Any, np.ndarray, np.ndarray]] = None
+
+
+def _init_worker(split: Tuple[Any, Any, np.ndarray, np.ndarray]) -> None:
+    global _split
+    _split = split
+
+
+def _latency_per_row(clf: RandomForestClassifier, X: Any, repeats: int = 3) -> Tuple[float, np.ndarray]:
+    """Best-of-`repeats` seconds per row for `predict_proba(X)`, and the probabilities."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        proba = clf.predict_proba(X)
+        best = min(best, time.perf_counter() - start)
+    return best / X.shape[0], proba
+
+
+def evaluate_config(
+    config: Dict[str, Any], space: SearchSpace, random_state: int = 42
+) -> Dict[str, Any]:
+    """Grow one configuration through `space.tree_steps` and measure every step."""
+    X_train, X_test, y_train, y_test = _split
+    clf = RandomForestClassifier(
+        **config,
+        **space.fixed_params,
+        class_weight=ZONE_CLASS_WEIGHTS,
+        random_state=random_state,
+        # The search runs one configuration per process
+        n_jobs=1,
+        warm_start=True,
+    )
+
+    candidates = []
+    fit_seconds = 0.0
+    best = -1.0
+    stale = 0
+    for n_trees in space.tree_steps:
+        clf.set_params(n_estimators=n_trees)
+        start = time.perf_counter()
+        clf.fit(X_train, y_train)
+        fit_seconds += time.perf_counter() - start
+
+        latency, proba = _latency_per_row(clf, X_test)
+        accuracy = float(np.mean(clf.classes_.take(proba.argmax(axis=1)) == y_test))
+        candidates.append(
+            {
+                "config_id": _config_id(config),
+                "params": {**config, **space.fixed_params, "n_estimators": n_trees},
+                "accuracy": accuracy,
+                "fit_seconds": fit_seconds,
+                "model_bytes": len(pickle.dumps(clf, protocol=pickle.HIGHEST_PROTOCOL)),
+                "nodes": int(sum(tree.tree_.node_count for tree in clf.estimators_)),
+                "latency_us_per_row": latency * 1e6,
+            }
+        )
+        if accuracy > best + space.min_delta:
+            best, stale = accuracy, 0
+        else:
+            stale += 1
+            if stale >= space.patience:
+                break
+
+    return {
+        "config": config,
+        "stopped_early": len(candidates) < len(space.tree_steps),
+        "candidates": candidates,
+    }
+
+
+def select_candidate(candidates: List[Dict[str, Any]], tolerance: float) -> Dict[str, Any]:
+    """The smallest candidate within `tolerance` of the best accuracy (then the fastest)."""
+    best = max(c["accuracy"] for c in candidates)
+    eligible = [c for c in candidates if c["accuracy"] >= best - tolerance]
+    return min(eligible, key=lambda c: (c["model_bytes"], c["latency_us_per_row"]))
+
+
+def _atomic_write_json(path: Path, data: Any) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def run_search(
+    X,
+    y,
+    fingerprint: Dict[str, Any],
+    cache_dir: str,
+    space: Optional[SearchSpace] = None,
+    workers: Optional[int] = None,
+    tolerance: float = 0.005,
+    random_state: int = 42,
+    progress: bool = True,
+) -> Dict[str, Any]:
+    """
+    Search `space` on the preprocessed (X, y) of the dataset identified by
+    `fingerprint` and return the report: every candidate, the best accuracy
+    and the chosen candidate.
+    """
+    space = space or SearchSpace()
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+
+    X_train, X_test, y_train, y_test = holdout_split(X, y, random_state)
+    pre = build_preprocessor()
+    split = (
+        pre.fit_transform(X_train),
+        pre.transform(X_test),
+        np.asarray(y_train),
+        np.asarray(y_test),
+    )
+
+    out_dir = Path(cache_dir) / cache_key(fingerprint, space, random_state)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    results: Dict[str, Dict[str, Any]] = {}
+    pending = []
+    for config in space.configs():
+        path = out_dir / f"{_config_id(config)}.json"
+        try:
+            results[_config_id(config)] = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            pending.append(config)
+    cached = len(results)
+
+    def finished(result: Dict[str, Any]) -> None:
+        config_id = _config_id(result["config"])
+        results[config_id] = result
+        _atomic_write_json(out_dir / f"{config_id}.json", result)
+        if progress:
+            last = result["candidates"][-1]
+            print(
+                f"[{len(results)}/{len(space.configs())}] {config_id}: "
+                f"{last['params']['n_estimators']} trees, accuracy {last['accuracy']:.4f}"
+                f"{' (stopped early)' if result['stopped_early'] else ''}",
+                file=sys.stderr,
+                flush=True,
+            )
+
+    if pending and workers <= 1:
+        _init_worker(split)
+        for config in pending:
+            finished(evaluate_config(config, space, random_state))
+    elif pending:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(pending)), initializer=_init_worker, initargs=(split,)
+        ) as pool:
+            futures = [pool.submit(evaluate_config, c, space, random_state) for c in pending]
+            for future in as_completed(futures):
+                finished(future.result())
+
+    candidates = [
+        c for config in space.configs() for c in results[_config_id(config)]["candidates"]
+    ]
+    chosen = select_candidate(candidates, tolerance)
+    return {
+        "fingerprint": fingerprint,
+        "cache_dir": str(out_dir),
+        "space": asdict(space),
+        "tolerance": tolerance,
+        "configs_cached": cached,
+        "configs_fitted": len(pending),
+        "search_seconds": time.perf_counter() - start,
+        "best_accuracy": max(c["accuracy"] for c in candidates),
+        "chosen": chosen,
+        "candidates": candidates,
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    chosen = report["chosen"]
+    lines = [
+        f"{'config':<20} {'trees':>5} {'accuracy':>8} {'fit s':>7} {'size MB':>8} {'us/row':>8}"
+    ]
+    for c in report["candidates"]:
+        mark = ""
+        if c is chosen:
+            mark = "  <- chosen"
+        elif c["accuracy"] >= report["best_accuracy"] - report["tolerance"]:
+            mark = "  *"
+        lines.append(
+            f"{c['config_id']:<20} {c['params']['n_estimators']:>5} {c['accuracy']:>8.4f} "
+            f"{c['fit_seconds']:>7.2f} {c['model_bytes'] / 1e6:>8.2f} {c['latency_us_per_row']:>8.2f}{mark}"
+        )
+    lines.append(
+        f"best accuracy {report['best_accuracy']:.4f}; * = within {report['tolerance']} of it; "
+        f"{report['configs_fitted']} configurations fitted, {report['configs_cached']} from cache "
+        f"({report['search_seconds']:.1f}s)"
+    )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search forest settings for the zone classifier")
+    parser.add_argument("--data-path", type=str, required=True, help="Path to the fisheries dataset.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.005,
+        help="Accuracy a smaller model may give up against the best one (default: 0.005).",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=os.getenv("FISH_SEARCH_CACHE_DIR", str(BACKEND_DIR / "model_search_cache")),
+        help="Where per-configuration results are cached.",
+    )
+    parser.add_argument(
+        "--model-dir",
+        default=os.getenv("FISH_MODEL_DIR", str(BACKEND_DIR / "model_artifacts")),
+        help="Model artifact directory the chosen model is saved to.",
+    )
+    parser.add_argument("--report", type=str, default=None, help="Also write the full report as JSON.")
+    parser.add_argument("--no-save", action="store_true", help="Only report; do not train and save the chosen model.")
+    args = parser.parse_args()
+
+    transformer = FeatureTransformer()
+    X, y, pre, _ = load_and_preprocess(args.data_path, transformer)
+    fingerprint = data_fingerprint(args.data_path)
+
+    report = run_search(
+        X, y, fingerprint, args.cache_dir, workers=args.workers, tolerance=args.tolerance
+    )
+    print(format_report(report))
+    if args.report:
+        Path(args.report).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    if args.no_save:
+        return
+    params = report["chosen"]["params"]
+    model, eval_results = train_zone_classifier(X, y, pre, forest_params=params)
+    eval_results["forest_params"] = params
+    save_model(model, eval_results, fingerprint, args.model_dir, transformer)
+    print(
+        f"Saved {report['chosen']['config_id']} with {params['n_estimators']} trees "
+        f"(accuracy {eval_results['accuracy']:.4f}) to {args.model_dir}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+On-disk artifact store for the trained zone classifier.
+
+The fitted `Pipeline` is saved together with its evaluation results, the
+`FeatureTransformer` fitted on the same data (so new observations can be
+scored without the dataset) and a fingerprint of the dataset it was trained
+on. On the next start the artifact is loaded (numpy arrays memory-mapped)
+instead of refitting the forest, as long as the fingerprint still matches.
+The fingerprint includes PIPELINE_VERSION, so artifacts from older code are
+retrained.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import joblib
+import pandas as pd
+import sklearn
+from sklearn.pipeline import Pipeline
+
+from ML.fish_advisory_pipeline import (
+    PIPELINE_VERSION,
+    FeatureTransformer,
+    load_and_preprocess,
+    span,
+    train_zone_classifier,
+)
+
+
+MODEL_FILENAME = "zone_classifier.joblib"
+FINGERPRINT_FILENAME = "zone_classifier.json"
+TRANSFORMER_FILENAME = "feature_transformer.joblib"
+
+_HASH_CHUNK_BYTES = 1 << 20
+
+
+def data_fingerprint(data_path: str) -> Dict[str, Any]:
+    """Identify a dataset file and the code that would train on it."""
+    path = Path(data_path).resolve()
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(_HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+
+    return {
+        "path": str(path),
+        "size": path.stat().st_size,
+        "sha256": digest.hexdigest(),
+        "pipeline_version": PIPELINE_VERSION,
+        # Pickled estimators are only guaranteed to load under the same sklearn
+        "sklearn_version": sklearn.__version__,
+    }
+
+
+def artifact_signature(artifact_dir: str) -> Optional[Dict[str, Any]]:
+    """
+    Identify the model artifact currently in `artifact_dir`, or None if there
+    is none. Changes whenever a model is saved there, even for the same data.
+    """
+    out_dir = Path(artifact_dir)
+    try:
+        meta = (out_dir / FINGERPRINT_FILENAME).read_bytes()
+        st = (out_dir / MODEL_FILENAME).stat()
+    except OSError:
+        return None
+    return {
+        "meta_sha256": hashlib.sha256(meta).hexdigest(),
+        "model_size": st.st_size,
+        "model_mtime_ns": st.st_mtime_ns,
+    }
+
+
+def _atomic_write_text(path: Path, text: str) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def save_model(
+    model: Pipeline,
+    eval_results: Dict[str, Any],
+    fingerprint: Dict[str, Any],
+    artifact_dir: str,
+    transformer: Optional[FeatureTransformer] = None,
+) -> Path:
+    """Persist the fitted pipeline, its eval results and the data fingerprint."""
+    out_dir = Path(artifact_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    if transformer is not None:
+        save_feature_transformer(transformer, artifact_dir)
+
+    model_path = out_dir / MODEL_FILENAME
+    tmp_model_path = model_path.with_suffix(model_path.suffix + ".tmp")
+    # Uncompressed so that the tree arrays can be memory-mapped on load
+    joblib.dump(model, tmp_model_path)
+    os.replace(tmp_model_path, model_path)
+
+    # Written last: a fingerprint on disk implies a complete model file
+    meta = {"fingerprint": fingerprint, "eval_results": eval_results}
+    _atomic_write_text(out_dir / FINGERPRINT_FILENAME, json.dumps(meta, indent=2))
+    return model_path
+
+
+def save_feature_transformer(transformer: FeatureTransformer, artifact_dir: str) -> Path:
+    path = Path(artifact_dir) / TRANSFORMER_FILENAME
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    joblib.dump(transformer, tmp)
+    os.replace(tmp, path)
+    return path
+
+
+def load_feature_transformer(artifact_dir: str) -> Optional[FeatureTransformer]:
+    """Return the `FeatureTransformer` saved in `artifact_dir`, or None."""
+    path = Path(artifact_dir) / TRANSFORMER_FILENAME
+    if not path.exists():
+        return None
+    return joblib.load(path)
+
+
+def load_model_artifact(
+    artifact_dir: str,
+    fingerprint: Dict[str, Any],
+    mmap_mode: Optional[str] = "r",
+) -> Optional[Tuple[Pipeline, Dict[str, Any]]]:
+    """
+    Return (model, eval_results) from `artifact_dir` if it was trained on data
+    matching `fingerprint`, otherwise None.
+    """
+    out_dir = Path(artifact_dir)
+    meta_path = out_dir / FINGERPRINT_FILENAME
+    model_path = out_dir / MODEL_FILENAME
+    if not meta_path.exists() or not model_path.exists():
+        return None
+
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if meta.get("fingerprint") != fingerprint:
+        return None
+
+    model = joblib.load(model_path, mmap_mode=mmap_mode)
+    return model, meta.get("eval_results", {})
+
+
+def load_or_train(
+    data_path: str,
+    artifact_dir: str,
+) -> Tuple[Pipeline, Dict[str, Any], pd.DataFrame, FeatureTransformer, bool]:
+    """
+    Preprocess `data_path` and return
+    (model, eval_results, df_full, transformer, from_cache).
+
+    The classifier is loaded from `artifact_dir` when its fingerprint matches
+    the dataset; otherwise it is trained and the artifact is (re)written.
+    """
+    transformer = FeatureTransformer()
+    with span("load.preprocess") as sp:
+        X, y, pre, df_full = load_and_preprocess(data_path, transformer)
+        sp.rows = len(df_full)
+    with span("load.fingerprint"):
+        fingerprint = data_fingerprint(data_path)
+
+    with span("load.model_artifact"):
+        cached = load_model_artifact(artifact_dir, fingerprint)
+    if cached is not None:
+        model, eval_results = cached
+        # Artifacts written before the transformer was persisted lack it
+        if not (Path(artifact_dir) / TRANSFORMER_FILENAME).exists():
+            save_feature_transformer(transformer, artifact_dir)
+        return model, eval_results, df_full, transformer, True
+
+    with span("load.train") as sp:
+        model, eval_results = train_zone_classifier(X, y, pre)
+        sp.rows = len(X)
+    save_model(model, eval_results, fingerprint, artifact_dir, transformer)
+    return model, eval_results, df_full, transformer, False
@@ -0,0 +1,293 @@
+"""
+Shared, memory-mapped model state for multi-worker deployments.
+
+`prepare_shared_state` runs once (in the launcher process): it loads or trains
+the classifier, scores every row, and writes the preprocessed dataset columns,
+the row scores and the (state, river) index as `.npy` files next to the
+model artifact. Each API worker then calls `load_shared_state`, which maps
+those files read-only, so the operating system keeps a single copy of the
+data in memory for all workers and no worker has to preprocess, train or
+score anything at start-up.
+
+The state is rebuilt when the dataset or the model artifact in the model
+directory changes (e.g. after ML/model_search.py saves a new model). Each
+version is written to its own `data-<hash>/` subdirectory and
+`manifest.json` is switched to it last, so the state can be rebuilt while
+workers are running (hot reload): a worker re-reading the manifest maps a
+complete new version, and mappings of the old one stay valid.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from ML.fish_advisory_pipeline import (
+    FEATURE_COLUMNS,
+    FeatureTransformer,
+    GroupIndex,
+    build_group_index,
+    compact_frame,
+    score_zones,
+)
+from ML.forest_compiler import CompiledForest, compile_pipeline
+from ML.model_store import (
+    FINGERPRINT_FILENAME,
+    artifact_signature,
+    data_fingerprint,
+    load_feature_transformer,
+    load_model_artifact,
+    load_or_train,
+    save_model,
+)
+
+
+MANIFEST_FILENAME = "manifest.json"
+# Bump when the on-disk layout below changes
+SHARED_STATE_VERSION = 1
+
+
+@dataclass
+class SharedState:
+    model: Any  # sklearn Pipeline, or CompiledForest with the "numpy" backend
+    eval_results: Dict[str, Any]
+    df_full: pd.DataFrame
+    transformer: FeatureTransformer
+    index: GroupIndex
+    zones: np.ndarray
+    confidences: np.ndarray
+    memory_report: Dict[str, Any]
+
+
+def _save_array(path: Path, arr: np.ndarray) -> None:
+    # Write-then-rename: workers still mapping the old file keep a valid view
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as fh:
+        np.save(fh, np.ascontiguousarray(arr))
+    os.replace(tmp, path)
+
+
+def save_frame(df: pd.DataFrame, out_dir: Path) -> List[Dict[str, Any]]:
+    """
+    Write every column of `df` as an `.npy` file and return the column specs.
+
+    Numeric and boolean columns are stored as-is; everything else is stored
+    as categorical codes plus a category table kept in the spec.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    specs: List[Dict[str, Any]] = []
+    for i, col in enumerate(df.columns):
+        filename = f"col_{i:03d}.npy"
+        series = df[col]
+        if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+            _save_array(out_dir / filename, series.to_numpy())
+            specs.append({"name": col, "file": filename, "kind": "array"})
+        else:
+            cat = pd.Categorical(series)
+            _save_array(out_dir / filename, cat.codes)
+            specs.append(
+                {
+                    "name": col,
+                    "file": filename,
+                    "kind": "categorical",
+                    "categories": [str(c) for c in cat.categories],
+                }
+            )
+    return specs
+
+
+def load_frame(
+    in_dir: Path,
+    specs: List[Dict[str, Any]],
+    mmap_mode: Optional[str] = "r",
+) -> pd.DataFrame:
+    """Rebuild a frame written by `save_frame` without copying the column data."""
+    columns: Dict[str, Any] = {}
+    for spec in specs:
+        arr = np.load(in_dir / spec["file"], mmap_mode=mmap_mode)
+        if spec["kind"] == "categorical":
+            columns[spec["name"]] = pd.Categorical.from_codes(arr, categories=spec["categories"])
+        else:
+            columns[spec["name"]] = arr
+    return pd.DataFrame(columns, copy=False)
+
+
+def _read_manifest(shared_dir: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads((shared_dir / MANIFEST_FILENAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _data_dir_name(fingerprint: Dict[str, Any], model: Optional[Dict[str, Any]]) -> str:
+    key = {"fingerprint": fingerprint, "model": model}
+    digest = hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8"))
+    return f"data-{digest.hexdigest()[:16]}"
+
+
+def _remove_stale_data_dirs(shared_dir: Path, keep: List[str]) -> None:
+    for path in shared_dir.glob("data-*"):
+        if path.is_dir() and path.name not in keep:
+            # Open mappings survive unlinking on POSIX; elsewhere leave it for the next run
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def matching_shared_state(
+    data_path: str,
+    model_dir: str,
+    shared_dir: str,
+) -> Optional[Dict[str, Any]]:
+    """
+    The manifest in `shared_dir` if its state was built from `data_path` and
+    the model artifact in `model_dir` as they are now, else None.
+    """
+    manifest = _read_manifest(Path(shared_dir))
+    if (
+        manifest is not None
+        and manifest.get("version") == SHARED_STATE_VERSION
+        and manifest.get("fingerprint") == data_fingerprint(data_path)
+        and manifest.get("model") == artifact_signature(model_dir)
+    ):
+        return manifest
+    return None
+
+
+def prepare_shared_state(
+    data_path: str,
+    model_dir: str,
+    shared_dir: str,
+) -> Dict[str, Any]:
+    """
+    Build the shared state for `data_path` in `shared_dir` and return its
+    manifest. Reuses what is already there if it was built from the same data
+    and the same model artifact.
+    """
+    out_dir = Path(shared_dir)
+    current = matching_shared_state(data_path, model_dir, shared_dir)
+    if current is not None:
+        return current
+    fingerprint = data_fingerprint(data_path)
+    previous = _read_manifest(out_dir)
+
+    model, eval_results, df_full, transformer, _ = load_or_train(data_path, model_dir)
+    df_full, memory_report = compact_frame(df_full)
+    index = build_group_index(df_full)
+    zones, confidences = score_zones(model, df_full[FEATURE_COLUMNS])
+    # After load_or_train, which (re)writes the artifact if it had to train
+    model_signature = artifact_signature(model_dir)
+
+    data_dir_name = _data_dir_name(fingerprint, model_signature)
+    data_dir = out_dir / data_dir_name
+    data_dir.mkdir(parents=True, exist_ok=True)
+    save_model(model, eval_results, fingerprint, str(data_dir), transformer)
+    compile_pipeline(model).save(str(data_dir / "forest"))
+    columns = save_frame(df_full, data_dir / "columns")
+
+    classes = [str(c) for c in model.classes_]
+    zone_codes = pd.Categorical(zones, categories=classes).codes
+    _save_array(data_dir / "zone_codes.npy", zone_codes)
+    _save_array(data_dir / "zone_confidences.npy", confidences)
+
+    # Group rows contiguously: positions of group g are order[starts[g]:stops[g]]
+    keys = list(index.positions.keys())
+    order = (
+        np.concatenate([index.positions[k] for k in keys])
+        if keys
+        else np.empty(0, dtype=np.intp)
+    )
+    _save_array(data_dir / "group_order.npy", order)
+    groups = []
+    start = 0
+    for key in keys:
+        stop = start + len(index.positions[key])
+        groups.append({"state": key[0], "river": key[1], "start": start, "stop": stop})
+        start = stop
+
+    manifest = {
+        "version": SHARED_STATE_VERSION,
+        "fingerprint": fingerprint,
+        "model": model_signature,
+        "data_dir": data_dir_name,
+        "rows": len(df_full),
+        "columns": columns,
+        "memory": memory_report,
+        "classes": classes,
+        "groups": groups,
+        "states": index.states,
+        "rivers_all": index.rivers_all,
+        "rivers_by_state": index.rivers_by_state,
+    }
+    # Written last: a manifest implies that every file it points at is complete
+    tmp = out_dir / (MANIFEST_FILENAME + ".tmp")
+    tmp.write_text(json.dumps(manifest), encoding="utf-8")
+    os.replace(tmp, out_dir / MANIFEST_FILENAME)
+
+    # Keep the previous version for workers that are still switching over
+    keep = [data_dir_name]
+    if previous is not None and previous.get("data_dir"):
+        keep.append(previous["data_dir"])
+    _remove_stale_data_dirs(out_dir, keep)
+    return manifest
+
+
+def load_shared_state(shared_dir: str, inference_backend: str = "sklearn") -> SharedState:
+    """
+    Map the state written by `prepare_shared_state` read-only.
+
+    With `inference_backend="numpy"` the model is the compiled forest, whose
+    arrays are memory-mapped too, so the forest is shared across workers as
+    well; with "sklearn" each worker unpickles its own copy of the pipeline.
+    """
+    manifest = _read_manifest(Path(shared_dir))
+    if manifest is None or manifest.get("version") != SHARED_STATE_VERSION:
+        raise FileNotFoundError(
+            f"No shared model state found in {shared_dir}. "
+            "Start the API through serve.py, which prepares it."
+        )
+    in_dir = Path(shared_dir) / manifest["data_dir"]
+
+    if inference_backend == "numpy":
+        model = CompiledForest.load(str(in_dir / "forest"))
+        meta = json.loads((in_dir / FINGERPRINT_FILENAME).read_text(encoding="utf-8"))
+        eval_results = meta.get("eval_results", {})
+    else:
+        loaded = load_model_artifact(str(in_dir), manifest["fingerprint"])
+        if loaded is None:
+            raise FileNotFoundError(f"Model artifact in {in_dir} does not match its manifest.")
+        model, eval_results = loaded
+
+    df_full = load_frame(in_dir / "columns", manifest["columns"])
+    transformer = load_feature_transformer(str(in_dir))
+    if transformer is None:
+        raise FileNotFoundError(f"Feature transformer missing from {in_dir}.")
+
+    classes = np.asarray(manifest["classes"], dtype=object)
+    zones = classes.take(np.load(in_dir / "zone_codes.npy"))
+    confidences = np.load(in_dir / "zone_confidences.npy", mmap_mode="r")
+
+    order = np.load(in_dir / "group_order.npy", mmap_mode="r")
+    index = GroupIndex(
+        positions={
+            (g["state"], g["river"]): order[g["start"]:g["stop"]] for g in manifest["groups"]
+        },
+        states=manifest["states"],
+        rivers_all=manifest["rivers_all"],
+        rivers_by_state=manifest["rivers_by_state"],
+    )
+
+    return SharedState(
+        model=model,
+        eval_results=eval_results,
+        df_full=df_full,
+        transformer=transformer,
+        index=index,
+        zones=zones,
+        confidences=confidences,
+        memory_report=manifest.get("memory", {}),
+    )
@@ -3,24 +3,52 @@ FastAPI Backend for Fish Advisory System
 Provides REST API endpoints for querying fish advisories by state and river.
 """
 
+import asyncio
+import io
+import json
 import os
+import secrets
 import sys
-from typing import List, Dict, Any, Optional
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Dict, Any, Iterable, Iterator, Literal, Optional, Tuple, Union
 from pathlib import Path
 
-# Add parent directory to path to import from ML folder
-sys.path.insert(0, str(Path(__file__).parent.parent))
+# Add the Backend directory (parent of the ML folder) to path for local imports
+sys.path.insert(0, str(Path(__file__).parent))
 
-from fastapi import FastAPI, HTTPException
+import pandas as pd
+from fastapi import FastAPI, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
 
 from ML.fish_advisory_pipeline import (
-    load_and_preprocess,
-    train_zone_classifier,
-    generate_advisories_for_state,
-    generate_heatmap_points,
+    PIPELINE_VERSION,
+    AdvisoryView,
+    FeatureTransformer,
+    GroupIndex,
+    SpatialIndex,
+    build_advisory_view,
+    build_group_index,
+    compact_frame,
+    generate_heatmap_arrays,
+    score_observations,
+    set_span_recorder,
+    span,
 )
+from ML.forest_compiler import compile_pipeline
+from ML.heatmap_tiles import AGGREGATIONS, TilePyramid, TilePyramidCache, tile_bounds
+from ML.model_store import load_or_train
+from ML.shared_store import MANIFEST_FILENAME, load_shared_state
+from executor import ExecutorSaturated, WorkExecutor
+from fast_json import dumps, dumps_with
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, PipelineMetrics, metrics_enabled
+from profiler import ProfileStore, SamplingProfiler, profiling_enabled
+from reloader import Reloader
+from response_cache import ResponseCache
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -38,10 +66,66 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global variables to cache model and data
-model = None
-df_full = None
-model_loaded = False
+
+@dataclass(frozen=True)
+class Snapshot:
+    """
+    Everything requests read: built together and published with a single
+    assignment to `snapshot`, so a request sees one consistent version even
+    while a reload swaps in the next one.
+    """
+
+    model: Any
+    eval_results: Dict[str, Any]
+    df_full: pd.DataFrame
+    feature_transformer: FeatureTransformer
+    group_index: GroupIndex
+    spatial_index: SpatialIndex
+    advisory_view: AdvisoryView
+    # Aggregated heatmap tiles per (state, river, weight) for this version
+    tile_cache: TilePyramidCache
+    # compact_frame report: df_full size before/after compaction
+    memory: Dict[str, Any]
+    version: int
+    source: str
+    loaded_at: float
+
+
+# The currently served model and data (None until the first load finishes)
+snapshot: Optional[Snapshot] = None
+
+# CPU-bound request work runs here, off the event loop (see executor.py)
+executor = WorkExecutor.from_env()
+
+# Largest batch accepted by /score/batch and /score/batch/upload
+SCORE_MAX_ROWS = int(os.getenv("FISH_SCORE_MAX_ROWS", "100000"))
+
+TILE_CACHE_SIZE = int(os.getenv("FISH_TILE_CACHE_SIZE", "64"))
+
+# Request and pipeline-stage metrics for /metrics (see metrics.py); None when disabled
+metrics: Optional[PipelineMetrics] = PipelineMetrics() if metrics_enabled() else None
+if metrics is not None:
+    set_span_recorder(metrics.record_span)
+
+# Encoded /advisory and /heatmap results, shared by identical concurrent requests
+# (see response_cache.py); keyed by snapshot version and cleared on every reload
+response_cache = ResponseCache.from_env()
+
+
+def _current() -> Snapshot:
+    """The snapshot to serve this request from, or 503 while none is loaded."""
+    snap = snapshot
+    if snap is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Model not loaded. Please wait for initialization."
+        )
+    return snap
+
+
+def _busy_response(exc: ExecutorSaturated) -> HTTPException:
+    """503 with Retry-After, returned when the executor queue is full."""
+    return HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "1"})
 
 
 # Request/Response Models
@@ -70,6 +154,28 @@ class AdvisoryResponse(BaseModel):
     river_name: str
 
 
+# Fields of one advisory in responses (streamed lines carry exactly these)
+ADVISORY_FIELDS = list(AdvisoryResponse.model_fields)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# Streamed lines are sent in chunks of about this size
+NDJSON_CHUNK_BYTES = 64 * 1024
+
+
+class NearbyAdvisoryResponse(AdvisoryResponse):
+    state: str
+    distance_km: float
+
+
+class NearbyAdvisoryListResponse(BaseModel):
+    success: bool
+    count: int
+    latitude: float
+    longitude: float
+    radius_km: float
+    advisories: List[NearbyAdvisoryResponse]
+
+
 class AdvisoryListResponse(BaseModel):
     success: bool
     count: int
@@ -78,6 +184,60 @@ class AdvisoryListResponse(BaseModel):
     advisories: List[AdvisoryResponse]
 
 
+class Observation(BaseModel):
+    id: Optional[str] = Field(None, description="Client identifier, echoed back in the result")
+    state: str
+    water_type: str = Field(..., description="Marine | Brackish")
+    season: str = Field(..., description="Monsoon | Summer | Winter | ...")
+    gear_type: str = Field(..., description="Trawl | Purse Seine | Gillnet | Hook and Line | ...")
+    sea_surface_temp_C: Optional[float] = None
+    chlorophyll_mg_m3: Optional[float] = None
+    depth_m: Optional[float] = None
+    min_legal_size_cm: Optional[float] = None
+    economic_value_in_INR_per_kg: Optional[float] = None
+    juvenile_range_cm: Optional[str] = Field(None, description="Juvenile length range, e.g. '9.0-16.2'")
+    seasonal_disease: Optional[str] = None
+
+
+class ScoreBatchRequest(BaseModel):
+    observations: List[Observation]
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "observations": [
+                    {
+                        "id": "survey-001",
+                        "state": "Kerala",
+                        "water_type": "Brackish",
+                        "season": "Monsoon",
+                        "gear_type": "Trawl",
+                        "sea_surface_temp_C": 28.4,
+                        "chlorophyll_mg_m3": 2.6,
+                        "depth_m": 12.0,
+                        "min_legal_size_cm": 20.0,
+                        "economic_value_in_INR_per_kg": 650.0,
+                        "juvenile_range_cm": "8.0-15.0",
+                        "seasonal_disease": None,
+                    }
+                ]
+            }
+        }
+
+
+class ScoreResult(BaseModel):
+    id: Optional[str] = None
+    zone: str
+    zone_confidence: float
+    juvenile_risk_score: int
+
+
+class ScoreBatchResponse(BaseModel):
+    success: bool
+    count: int
+    results: List[ScoreResult]
+
+
 class HeatmapRequest(BaseModel):
     state: str = Field(..., description="Indian coastal state name (e.g., 'Kerala')")
     river_name: str = Field(..., description="River name (e.g., 'Periyar')")
@@ -85,6 +245,10 @@ class HeatmapRequest(BaseModel):
         default="juvenile_risk_prob",
         description="Heatmap weight: juvenile_risk_prob | juvenile_risk_score | chlorophyll_mg_m3 | depth_m",
     )
+    format: Literal["points", "columnar"] = Field(
+        default="points",
+        description="points: list of {lat, lon, value}; columnar: {lat: [...], lon: [...], value: [...]}",
+    )
 
 
 class HeatmapPoint(BaseModel):
@@ -102,14 +266,44 @@ class HeatmapResponse(BaseModel):
     points: List[HeatmapPoint]
 
 
-def load_model():
-    """Load and train the model once on startup."""
-    global model, df_full, model_loaded
-    
-    if model_loaded:
-        return
-    
-    # Data path: env FISH_DATA_PATH, or Backend/converted_final.csv
+class HeatmapColumns(BaseModel):
+    lat: List[float]
+    lon: List[float]
+    value: List[float]
+
+
+class HeatmapColumnarResponse(BaseModel):
+    success: bool
+    state: str
+    river_name: str
+    weight: str
+    count: int
+    columns: HeatmapColumns
+
+
+class HeatmapCell(BaseModel):
+    lat: float = Field(..., description="Centroid latitude of the points in the cell")
+    lon: float = Field(..., description="Centroid longitude of the points in the cell")
+    value: float = Field(..., description="Aggregated weight (0..1)")
+    count: int = Field(..., description="Number of points in the cell")
+
+
+class HeatmapTileResponse(BaseModel):
+    success: bool
+    state: str
+    river_name: str
+    weight: str
+    agg: str
+    z: int
+    x: int
+    y: int
+    bounds: Dict[str, float]
+    count: int
+    cells: List[HeatmapCell]
+
+
+def resolve_data_path() -> str:
+    """Data path: env FISH_DATA_PATH, or Backend/converted_final.csv."""
     default_path = Path(__file__).parent / "converted_final.csv"
     data_path = os.getenv("FISH_DATA_PATH", str(default_path))
 
@@ -119,21 +313,180 @@ def load_model():
             f"Dataset file not found at: {data_path}\n"
             "Please set FISH_DATA_PATH environment variable or update the default path in api.py"
         )
+    return data_path
+
+
+def resolve_model_dir() -> str:
+    """Trained model artifacts: env FISH_MODEL_DIR, or Backend/model_artifacts."""
+    default_model_dir = Path(__file__).parent / "model_artifacts"
+    return os.getenv("FISH_MODEL_DIR", str(default_model_dir))
+
+
+def resolve_inference_backend() -> str:
+    """Forest evaluator: env FISH_INFERENCE_BACKEND, "sklearn" (default) or "numpy"."""
+    backend = os.getenv("FISH_INFERENCE_BACKEND", "sklearn").lower()
+    if backend not in ("sklearn", "numpy"):
+        raise ValueError(f"Unknown FISH_INFERENCE_BACKEND: {backend} (expected sklearn or numpy)")
+    return backend
+
+
+def build_snapshot(version: int = 1) -> Snapshot:
+    """Load data and model and build every derived index, without publishing anything."""
+    start = time.perf_counter()
+    scores = None
+    backend = resolve_inference_backend()
+    shared_dir = os.getenv("FISH_SHARED_DIR")
+    if shared_dir:
+        # Multi-worker mode (serve.py): map the state the launcher prepared
+        print(f"Mapping shared model state from {shared_dir}...")
+        with span("load.shared_state"):
+            shared = load_shared_state(shared_dir, backend)
+        model, eval_results, df_full = shared.model, shared.eval_results, shared.df_full
+        feature_transformer = shared.transformer
+        group_index = shared.index
+        memory = shared.memory_report
+        scores = (shared.zones, shared.confidences)
+        source = f"shared state in {shared_dir}"
+    else:
+        data_path = resolve_data_path()
+        model_dir = resolve_model_dir()
+
+        print("Loading and preprocessing data...")
+        model, eval_results, df_full, feature_transformer, from_cache = load_or_train(
+            data_path, model_dir
+        )
+        source = f"cached artifact in {model_dir}" if from_cache else "freshly trained"
+        # Categorical strings, narrow integers, no raw-only columns
+        with span("load.compact"):
+            df_full, memory = compact_frame(df_full)
+        if backend == "numpy":
+            # Flat NumPy forest: no sklearn per-call overhead on small batches
+            with span("load.compile"):
+                model = compile_pipeline(model)
+
+        # (state, river) -> row positions, so queries never scan the whole frame
+        with span("load.group_index"):
+            group_index = build_group_index(df_full)
     
-    print("Loading and preprocessing data...")
-    X, y, pre, df_full = load_and_preprocess(data_path)
-    
-    print("Training model...")
-    model, eval_results = train_zone_classifier(X, y, pre)
-    
-    print(f"Model loaded successfully! Accuracy: {eval_results['accuracy']:.3f}")
-    model_loaded = True
+    print(
+        f"Model loaded successfully ({source}, {backend} backend, "
+        f"{time.perf_counter() - start:.2f}s)! "
+        f"Accuracy: {eval_results['accuracy']:.3f}"
+    )
+    if memory:
+        print(
+            f"Dataset in memory: {memory['rows']} rows, "
+            f"{memory['bytes_before'] / 1e6:.2f} MB -> {memory['bytes_after'] / 1e6:.2f} MB"
+        )
+
+    # Workers mapping the shared state build the advisory dicts and the BallTree
+    # on first use instead (in the executor, see _advisory_data and
+    # get_nearby_advisories): both are Python objects each worker would
+    # otherwise hold a full copy of, and building them dominated worker startup
+    lazy = bool(shared_dir)
+
+    # Haversine BallTree over all records for /advisory/nearby
+    with span("load.spatial_index"):
+        spatial_index = SpatialIndex(df_full, lazy=lazy)
+
+    # Precompute every advisory so /advisory is a lookup; rebuilt on every (re)load
+    with span("load.advisory_view") as sp:
+        advisory_view = build_advisory_view(model, df_full, group_index, scores, lazy=lazy)
+        sp.rows = len(df_full)
+    view_stats = advisory_view.summary()
+    if lazy:
+        print(
+            f"Advisory view: {view_stats['rows']} rows in {view_stats['groups']} "
+            f"state/river groups, built per group on first request"
+        )
+    else:
+        print(
+            f"Advisory view built: {view_stats['rows']} rows in {view_stats['groups']} "
+            f"state/river groups, {view_stats['build_seconds']:.2f}s, "
+            f"~{view_stats['size_bytes'] / 1e6:.1f} MB"
+        )
+
+    return Snapshot(
+        model=model,
+        eval_results=eval_results,
+        df_full=df_full,
+        feature_transformer=feature_transformer,
+        group_index=group_index,
+        spatial_index=spatial_index,
+        advisory_view=advisory_view,
+        tile_cache=TilePyramidCache(max_entries=TILE_CACHE_SIZE),
+        memory=memory,
+        version=version,
+        source=source,
+        loaded_at=time.time(),
+    )
+
+
+def install_snapshot(new: Snapshot) -> None:
+    """Publish `new`; requests already running finish on the snapshot they hold."""
+    global snapshot
+    snapshot = new
+    response_cache.clear()
+    # Forked pool workers still hold the previous state
+    executor.reset_process_pool()
+
+
+def load_model():
+    """Load the model once on startup, training it only if no matching artifact exists."""
+    if snapshot is not None:
+        return
+    with span("load.total"):
+        new = build_snapshot()
+    install_snapshot(new)
+
+
+def _rebuild_snapshot() -> Snapshot:
+    current = snapshot
+    with span("load.total"):
+        return build_snapshot(version=current.version + 1 if current is not None else 1)
+
+
+# Hot reload: /admin/reload, or FISH_RELOAD_WATCH=1 to follow the data file
+reloader = Reloader(_rebuild_snapshot, install_snapshot)
+_watch_task: Optional[asyncio.Task] = None
+
+
+def reload_watch_settings() -> Tuple[bool, float]:
+    """
+    (enabled, interval in seconds) from FISH_RELOAD_WATCH / FISH_RELOAD_INTERVAL.
+
+    Read at startup rather than import: serve.py imports this module before it
+    sets them, and a single uvicorn worker reuses that import.
+    """
+    enabled = os.getenv("FISH_RELOAD_WATCH", "0").lower() in ("1", "true", "yes")
+    return enabled, float(os.getenv("FISH_RELOAD_INTERVAL", "5"))
+
+
+def resolve_watch_path() -> str:
+    """The file whose changes trigger a reload: the shared-state manifest or the dataset."""
+    shared_dir = os.getenv("FISH_SHARED_DIR")
+    if shared_dir:
+        return str(Path(shared_dir) / MANIFEST_FILENAME)
+    return resolve_data_path()
 
 
 @app.on_event("startup")
 async def startup_event():
     """Load model when API starts."""
+    global _watch_task
     load_model()
+    watch, interval = reload_watch_settings()
+    if watch:
+        _watch_task = asyncio.create_task(reloader.watch(resolve_watch_path, interval))
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the worker pools."""
+    if _watch_task is not None:
+        _watch_task.cancel()
+    reloader.shutdown()
+    executor.shutdown()
 
 
 @app.get("/")
@@ -144,7 +497,15 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "/advisory": "POST - Get fish advisories for a state and river",
+            "/advisory/nearby": "GET - Nearest fish advisories to a GPS position",
+            "/score/batch": "POST - Score new observations (JSON)",
+            "/score/batch/upload": "POST - Score new observations (CSV or NDJSON body)",
+            "/heatmap": "POST - Heatmap points for a state and river",
+            "/heatmap/tiles/{z}/{x}/{y}": "GET - Aggregated heatmap cells for one map tile",
             "/health": "GET - Health check",
+            "/admin/reload": "POST - Reload dataset and model in the background",
+            "/metrics": "GET - Request and pipeline-stage metrics (Prometheus text format)",
+            "/admin/profiles": "GET - Stored request profiles (FISH_PROFILING=1, ?profile=1 on any request)",
             "/docs": "GET - API documentation (Swagger UI)"
         }
     }
@@ -153,49 +514,112 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
+    snap = snapshot
     return {
         "status": "healthy",
-        "model_loaded": model_loaded
+        "model_loaded": snap is not None,
+        "data_version": snap.version if snap is not None else None,
+        "loaded_at": snap.loaded_at if snap is not None else None,
+        "source": snap.source if snap is not None else None,
+        "advisory_view": snap.advisory_view.summary() if snap is not None else None,
+        "dataset_memory": snap.memory if snap is not None else None,
+        "executor": executor.stats(),
+        "response_cache": response_cache.stats(),
+        "reload": reloader.status(),
     }
 
 
+def _ndjson_chunks(advisories: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """Encode advisories as NDJSON lines, yielded in chunks of ~NDJSON_CHUNK_BYTES."""
+    lines: List[str] = []
+    size = 0
+    for advisory in advisories:
+        line = json.dumps({k: advisory[k] for k in ADVISORY_FIELDS}, ensure_ascii=False) + "\n"
+        lines.append(line)
+        size += len(line)
+        if size >= NDJSON_CHUNK_BYTES:
+            yield "".join(lines)
+            lines, size = [], 0
+    if lines:
+        yield "".join(lines)
+
+
+async def _advisory_data(snap: Snapshot, state: str, river_name: str) -> Tuple[int, bytes]:
+    """Number of advisories for the pair and their encoded list."""
+    view = snap.advisory_view
+    with span("advisory.lookup") as sp:
+        if view.is_ready(state, river_name):
+            # Precomputed (at load time, or by an earlier request): a lookup
+            advisories = view.lookup(state, river_name)
+        else:
+            # Lazy view (shared-state workers): the first request for the pair
+            # builds its advisories, which must not block the event loop
+            advisories = await executor.run(view.lookup, state, river_name)
+        sp.rows = len(advisories)
+    with span("advisory.serialize"):
+        return len(advisories), dumps([{k: a[k] for k in ADVISORY_FIELDS} for a in advisories])
+
+
 @app.post("/advisory", response_model=AdvisoryListResponse)
-async def get_advisory(request: AdvisoryRequest):
+async def get_advisory(
+    request: AdvisoryRequest,
+    http_request: Request,
+    stream: bool = Query(False, description="Stream advisories as NDJSON, one per line"),
+):
     """
     Get fish advisories for a given state and river.
     
     Returns a list of advisory objects, one for each fish species record
     found in the specified state AND river_name.
+
+    With `?stream=true` or `Accept: application/x-ndjson`, the advisories are
+    streamed as newline-delimited JSON (chunked) instead of one JSON document;
+    the number of advisories is sent in the `X-Advisory-Count` header.
     """
-    if not model_loaded:
-        raise HTTPException(
-            status_code=503,
-            detail="Model not loaded. Please wait for initialization."
+    snap = _current()
+
+    if stream or NDJSON_MEDIA_TYPE in http_request.headers.get("accept", ""):
+        count = snap.advisory_view.count(request.state, request.river_name)
+        if count == 0:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No fish records found for state: {request.state}"
+            )
+        return StreamingResponse(
+            _ndjson_chunks(snap.advisory_view.iter_lookup(request.state, request.river_name)),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers={"X-Advisory-Count": str(count)},
         )
     
     try:
-        # Generate advisories
-        advisories = generate_advisories_for_state(
-            model=model,
-            full_df=df_full,
-            state=request.state,
-            river_name=request.river_name,
+        key = ("advisory", snap.version, request.state.lower(), request.river_name.lower())
+        (count, encoded), cache_status = await response_cache.get_or_compute(
+            key, lambda: _advisory_data(snap, request.state, request.river_name)
         )
         
-        if not advisories:
+        if count == 0:
             raise HTTPException(
                 status_code=404,
                 detail=f"No fish records found for state: {request.state}"
             )
         
-        return {
-            "success": True,
-            "count": len(advisories),
-            "state": request.state,
-            "river_name": request.river_name,
-            "advisories": advisories
-        }
+        # Built from already-typed advisories, so skip response_model validation
+        body = dumps_with(
+            {
+                "success": True,
+                "count": count,
+                "state": request.state,
+                "river_name": request.river_name,
+            },
+            "advisories",
+            encoded,
+        )
+        return Response(content=body, media_type="application/json", headers={"X-Cache": cache_status})
     
+    except HTTPException:
+        raise
+    except ExecutorSaturated as e:
+        raise _busy_response(e)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -203,16 +627,139 @@ async def get_advisory(request: AdvisoryRequest):
         )
 
 
-@app.get("/states")
-async def get_available_states():
-    """Get list of available states in the dataset."""
-    if not model_loaded or df_full is None:
+@app.get("/advisory/nearby", response_model=NearbyAdvisoryListResponse)
+async def get_nearby_advisories(
+    lat: float = Query(..., ge=-90.0, le=90.0, description="Latitude in degrees"),
+    lon: float = Query(..., ge=-180.0, le=180.0, description="Longitude in degrees"),
+    radius_km: float = Query(25.0, gt=0.0, le=2000.0, description="Search radius in km"),
+    k: int = Query(10, ge=1, le=100, description="Maximum number of advisories"),
+):
+    """
+    Get the advisories for the k records nearest to a GPS position, within
+    `radius_km`, closest first. Uses a haversine BallTree, built at load time
+    (or, in shared-state workers, by the first nearby request).
+    """
+    snap = _current()
+
+    try:
+        # Shared-state workers build the tree and advisories on first use; off the event loop
+        if not snap.spatial_index.built:
+            await executor.run(snap.spatial_index.build)
+        positions, distances = snap.spatial_index.nearest(lat, lon, k, radius_km)
+        states = snap.spatial_index.states(positions)
+        positions = positions.tolist()
+        if snap.advisory_view.rows_ready(positions):
+            rows = snap.advisory_view.rows_at(positions)
+        else:
+            rows = await executor.run(snap.advisory_view.rows_at, positions)
+    except ExecutorSaturated as e:
+        raise _busy_response(e)
+    advisories = [
+        {**row, "state": state, "distance_km": round(float(dist), 3)}
+        for row, state, dist in zip(rows, states, distances.tolist())
+    ]
+    return {
+        "success": True,
+        "count": len(advisories),
+        "latitude": lat,
+        "longitude": lon,
+        "radius_km": radius_km,
+        "advisories": advisories,
+    }
+
+
+def _score_records(records: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Score raw observation rows against the loaded model and dataset.
+
+    Module-level so it can run in the executor's process pool; there the
+    model is loaded on first use (or inherited from the parent on fork).
+    """
+    load_model()
+    snap = snapshot
+    scored = score_observations(snap.model, records, snap.feature_transformer)
+
+    if "id" in records.columns:
+        ids = [None if pd.isna(v) else str(v) for v in records["id"].tolist()]
+    else:
+        ids = [None] * len(records)
+    return [
+        {"id": i, "zone": z, "zone_confidence": c, "juvenile_risk_score": r}
+        for i, z, c, r in zip(
+            ids,
+            scored["zone"].tolist(),
+            scored["zone_confidence"].tolist(),
+            scored["juvenile_risk_score"].astype(int).tolist(),
+        )
+    ]
+
+
+async def _score_response(records: pd.DataFrame) -> Dict[str, Any]:
+    if len(records) > SCORE_MAX_ROWS:
         raise HTTPException(
-            status_code=503,
-            detail="Model not loaded. Please wait for initialization."
+            status_code=413,
+            detail=f"Too many observations: {len(records)} (limit {SCORE_MAX_ROWS} per request)",
         )
+    try:
+        results = await executor.run(_score_records, records, heavy=True)
+    except ExecutorSaturated as e:
+        raise _busy_response(e)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error scoring observations: {str(e)}")
+    return {"success": True, "count": len(results), "results": results}
+
+
+@app.post("/score/batch", response_model=ScoreBatchResponse)
+async def score_batch(request: ScoreBatchRequest):
+    """
+    Score user-submitted observations (SST, chlorophyll, depth, season, gear,
+    juvenile range, ...) with the trained model, applying the same feature
+    engineering as the training data. Results are returned in input order.
+    """
+    _current()
+
+    fields = list(Observation.model_fields)
+    records = pd.DataFrame(
+        {f: [getattr(obs, f) for obs in request.observations] for f in fields}
+    )
+    return await _score_response(records)
 
-    states = sorted(df_full["state"].unique().tolist())
+
+@app.post("/score/batch/upload", response_model=ScoreBatchResponse)
+async def score_batch_upload(request: Request):
+    """
+    Same as /score/batch, but the request body is a file of observations:
+    `Content-Type: text/csv` (header row with the Observation field names)
+    or `application/x-ndjson` (one JSON object per line).
+    """
+    _current()
+
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    body = await request.body()
+    try:
+        if content_type in ("text/csv", "application/csv"):
+            records = pd.read_csv(io.BytesIO(body), dtype={"id": str, "juvenile_range_cm": str})
+        elif content_type in ("application/x-ndjson", "application/jsonl", "application/jsonlines"):
+            records = pd.read_json(io.BytesIO(body), lines=True, dtype={"id": str, "juvenile_range_cm": str})
+        else:
+            raise HTTPException(
+                status_code=415,
+                detail="Unsupported Content-Type; use text/csv or application/x-ndjson",
+            )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse request body: {str(e)}")
+
+    return await _score_response(records)
+
+
+@app.get("/states")
+async def get_available_states():
+    """Get list of available states in the dataset."""
+    states = _current().group_index.states
     return {
         "success": True,
         "count": len(states),
@@ -223,18 +770,11 @@ async def get_available_states():
 @app.get("/rivers")
 async def get_available_rivers(state: Optional[str] = None):
     """Get list of rivers in the dataset, optionally filtered by state."""
-    if not model_loaded or df_full is None:
-        raise HTTPException(
-            status_code=503,
-            detail="Model not loaded. Please wait for initialization."
-        )
-    if "river_name" not in df_full.columns:
+    snap = _current()
+    if "river_name" not in snap.df_full.columns:
         return {"success": True, "count": 0, "rivers": []}
 
-    subset = df_full
-    if state:
-        subset = df_full[df_full["state"].str.lower() == state.lower()]
-    rivers = sorted(subset["river_name"].astype(str).unique().tolist())
+    rivers = snap.group_index.rivers(state)
     return {
         "success": True,
         "count": len(rivers),
@@ -242,47 +782,377 @@ async def get_available_rivers(state: Optional[str] = None):
     }
 
 
-@app.post("/heatmap", response_model=HeatmapResponse)
+def _heatmap_data(snap: Snapshot, request: HeatmapRequest) -> Tuple[int, str, bytes]:
+    """Point count, member name and encoded points for /heatmap, straight from the arrays."""
+    lat, lon, value = generate_heatmap_arrays(
+        snap.df_full, request.state, request.river_name, request.weight, index=snap.group_index
+    )
+    with span("heatmap.serialize"):
+        if request.format == "columnar":
+            return len(value), "columns", dumps({"lat": lat, "lon": lon, "value": value})
+        points = [
+            {"lat": la, "lon": lo, "value": v}
+            for la, lo, v in zip(lat.tolist(), lon.tolist(), value.tolist())
+        ]
+        return len(value), "points", dumps(points)
+
+
+@app.post("/heatmap", response_model=Union[HeatmapResponse, HeatmapColumnarResponse])
 async def get_heatmap(request: HeatmapRequest):
     """
     Returns weighted lat/lon points for a frontend heatmap layer for a given state + river.
+
+    `format: "columnar"` returns the same points as three parallel arrays
+    (`columns.lat`, `columns.lon`, `columns.value`), which is smaller and
+    faster to encode and decode for large heatmaps.
     """
-    if not model_loaded or df_full is None:
-        raise HTTPException(status_code=503, detail="Model not loaded. Please wait for initialization.")
+    snap = _current()
 
     try:
-        points = generate_heatmap_points(
-            full_df=df_full,
-            state=request.state,
-            river_name=request.river_name,
-            weight=request.weight,
-        )
         # Return 200 with empty list so frontend can show map + "no data" message
+        key = (
+            "heatmap",
+            snap.version,
+            request.state.lower(),
+            request.river_name.lower(),
+            request.weight,
+            request.format,
+        )
+        (count, member, encoded), cache_status = await response_cache.get_or_compute(
+            key, lambda: executor.run(_heatmap_data, snap, request)
+        )
+        body = dumps_with(
+            {
+                "success": True,
+                "state": request.state,
+                "river_name": request.river_name,
+                "weight": request.weight,
+                "count": count,
+            },
+            member,
+            encoded,
+        )
+        return Response(content=body, media_type="application/json", headers={"X-Cache": cache_status})
+    except HTTPException:
+        raise
+    except ExecutorSaturated as e:
+        raise _busy_response(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating heatmap: {str(e)}")
+
+
+def _heatmap_tile_cells(
+    snap: Snapshot, state: str, river_name: str, weight: str, z: int, x: int, y: int, agg: str
+) -> List[Dict[str, float]]:
+    key = (state.lower(), river_name.lower(), weight)
+    pyramid = snap.tile_cache.get_or_build(
+        key,
+        lambda: TilePyramid(
+            *generate_heatmap_arrays(snap.df_full, state, river_name, weight, index=snap.group_index)
+        ),
+    )
+    return pyramid.tile(z, x, y, agg)
+
+
+@app.get("/heatmap/tiles/{z}/{x}/{y}", response_model=HeatmapTileResponse)
+async def get_heatmap_tile(
+    z: int,
+    x: int,
+    y: int,
+    state: str,
+    river_name: str,
+    weight: str = "juvenile_risk_prob",
+    agg: str = "mean",
+):
+    """
+    Returns heatmap points for a state + river aggregated into the grid cells
+    of one slippy-map tile (z/x/y, Web Mercator as used by Leaflet/OSM).
+
+    `agg` selects the cell value: mean | max weight, or count (relative point density).
+    """
+    snap = _current()
+
+    bounds = tile_bounds(z, x, y)
+    if bounds is None:
+        raise HTTPException(status_code=400, detail=f"Invalid tile coordinates: {z}/{x}/{y}")
+    if agg not in AGGREGATIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown agg: {agg} (expected one of {', '.join(AGGREGATIONS)})",
+        )
+
+    try:
+        cells = await executor.run(_heatmap_tile_cells, snap, state, river_name, weight, z, x, y, agg)
         return {
             "success": True,
-            "state": request.state,
-            "river_name": request.river_name,
-            "weight": request.weight,
-            "count": len(points),
-            "points": points or [],
+            "state": state,
+            "river_name": river_name,
+            "weight": weight,
+            "agg": agg,
+            "z": z,
+            "x": x,
+            "y": y,
+            "bounds": bounds,
+            "count": len(cells),
+            "cells": cells,
         }
     except HTTPException:
         raise
+    except ExecutorSaturated as e:
+        raise _busy_response(e)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generating heatmap: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error generating heatmap tile: {str(e)}")
 
 
-if __name__ == "__main__":
-    import uvicorn
-    
-    # Load model before starting server
-    load_model()
-    
-    # Run the API server
-    uvicorn.run(
-        "api:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True  # Set to False in production
+def _admin_token_error(x_admin_token: Optional[str]) -> Optional[str]:
+    """
+    Why `x_admin_token` does not grant admin access, or None if it does.
+
+    Admin endpoints are closed unless FISH_ADMIN_TOKEN is set, and then the
+    X-Admin-Token header must match it.
+    """
+    token = os.getenv("FISH_ADMIN_TOKEN")
+    if not token:
+        return "Admin endpoints are disabled (set FISH_ADMIN_TOKEN)"
+    if not secrets.compare_digest(x_admin_token or "", token):
+        return "Invalid admin token"
+    return None
+
+
+def _require_admin(x_admin_token: Optional[str]) -> None:
+    error = _admin_token_error(x_admin_token)
+    if error is not None:
+        raise HTTPException(status_code=403, detail=error)
+
+
+@app.post("/admin/reload")
+async def admin_reload(
+    wait: bool = Query(False, description="Respond only once the reload has finished"),
+    x_admin_token: Optional[str] = Header(None),
+):
+    """
+    Reload the dataset and model in the background and swap them in atomically.
+
+    Requests keep being served from the current version until the new one is
+    ready; if the reload fails, the current version stays. Requires
+    FISH_ADMIN_TOKEN to be set and a matching X-Admin-Token header.
+    """
+    _require_admin(x_admin_token)
+
+    future = reloader.trigger()
+    if wait:
+        try:
+            await asyncio.wrap_future(future)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Reload failed: {str(e)}")
+
+    snap = snapshot
+    return {
+        "success": True,
+        "reloading": not future.done(),
+        "data_version": snap.version if snap is not None else None,
+        "reload": reloader.status(),
+    }
+
+
+def _model_samples():
+    snap = snapshot
+    if snap is None:
+        return []
+    return [(
+        {
+            "data_version": snap.version,
+            "pipeline_version": PIPELINE_VERSION,
+            "backend": resolve_inference_backend(),
+            "source": snap.source,
+        },
+        1,
+    )]
+
+
+def _snapshot_value(read):
+    def collect():
+        snap = snapshot
+        return [({}, read(snap))] if snap is not None else []
+    return collect
+
+
+def _register_state_metrics(m: PipelineMetrics) -> None:
+    """Scrape-time metrics read from the current snapshot, cache, executor and reloader."""
+    r = m.registry
+    r.callback("fish_model_info", "The served model and data (value is always 1).", _model_samples)
+    r.callback("fish_data_version", "Version of the served data (bumped on every reload).",
+               _snapshot_value(lambda snap: snap.version))
+    r.callback("fish_data_rows", "Rows in the served dataset.", _snapshot_value(lambda snap: len(snap.df_full)))
+    r.callback("fish_data_loaded_timestamp_seconds", "When the served data was loaded (Unix time).",
+               _snapshot_value(lambda snap: snap.loaded_at))
+    r.callback("fish_model_accuracy", "Hold-out accuracy of the served model.",
+               _snapshot_value(lambda snap: snap.eval_results.get("accuracy")))
+    r.callback(
+        "fish_reloads_total",
+        "Finished reloads by result.",
+        lambda: [({"result": "success"}, reloader.reloads), ({"result": "failure"}, reloader.failures)],
+        kind="counter",
+    )
+    r.callback(
+        "fish_response_cache_events_total",
+        "Response cache lookups and removals by event.",
+        lambda: [
+            ({"event": event}, getattr(response_cache, attr))
+            for event, attr in (
+                ("hit", "hits"),
+                ("miss", "misses"),
+                ("coalesced", "coalesced"),
+                ("eviction", "evictions"),
+                ("expiration", "expirations"),
+            )
+        ],
+        kind="counter",
     )
+    r.callback("fish_response_cache_entries", "Responses currently cached.", lambda: [({}, len(response_cache))])
+    r.callback("fish_executor_pending", "Jobs running or queued in the request executor.",
+               lambda: [({}, executor.pending)])
+    r.callback("fish_executor_rejected_total", "Jobs rejected because the executor was full.",
+               lambda: [({}, executor.rejected)], kind="counter")
+
+
+if metrics is not None:
+    _register_state_metrics(metrics)
+
+    @app.middleware("http")
+    async def record_request_metrics(request: Request, call_next):
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            # The route template, not the raw path, keeps label cardinality bounded
+            route = request.scope.get("route")
+            snap = snapshot
+            metrics.observe_request(
+                request.method,
+                getattr(route, "path", "unmatched"),
+                status,
+                snap.version if snap is not None else "none",
+                time.perf_counter() - start,
+            )
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Request latency histograms per route, pipeline stage timings and row
+    counts, and model/data/cache gauges, in the Prometheus text format.
+    """
+    if metrics is None:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (FISH_METRICS=0)")
+    return Response(content=metrics.registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+# Per-request profiling with ?profile=1 or X-Profile: 1 (see profiler.py); off unless FISH_PROFILING=1
+PROFILING = profiling_enabled()
+PROFILE_INTERVAL = float(os.getenv("FISH_PROFILE_INTERVAL_MS", "2")) / 1000.0
+profile_store = ProfileStore.from_env()
+
+
+def _profile_requested(request: Request) -> bool:
+    flag = request.query_params.get("profile") or request.headers.get("x-profile")
+    return flag is not None and flag.lower() in ("1", "true", "yes")
+
+
+async def _off_loop(fn, *args):
+    """
+    Run blocking profiler work (joining the sampler thread, writing files) on
+    a worker thread; shielded so that it still finishes if the request is
+    cancelled, e.g. when the client disconnects mid-stream.
+    """
+    return await asyncio.shield(run_in_threadpool(fn, *args))
+
+
+if PROFILING:
+
+    @app.middleware("http")
+    async def profile_request(request: Request, call_next):
+        if not _profile_requested(request):
+            return await call_next(request)
+        error = _admin_token_error(request.headers.get("x-admin-token"))
+        if error is not None:
+            return JSONResponse(status_code=403, content={"detail": error})
+
+        # The event loop thread runs the handler; CPU-bound parts run on executor
+        # threads, streamed bodies and sync code on AnyIO worker threads. Those
+        # pools are shared, so other requests running meanwhile are sampled too.
+        profiler = SamplingProfiler(
+            threading.get_ident(),
+            include_thread=lambda name: name.startswith(("fish-work", "AnyIO worker")),
+            interval=PROFILE_INTERVAL,
+        ).start()
+        try:
+            response = await call_next(request)
+        except BaseException:
+            await _off_loop(profiler.stop)
+            raise
+
+        profile_id = profile_store.new_id()
+        body = response.body_iterator
+
+        def finish():
+            profiler.stop()
+            route = request.scope.get("route")
+            profile_store.save(
+                profile_id,
+                profiler,
+                {
+                    "method": request.method,
+                    "path": request.url.path,
+                    "endpoint": getattr(route, "path", "unmatched"),
+                    "status": response.status_code,
+                    "created": time.time(),
+                },
+            )
+
+        async def profiled_body():
+            # Streamed responses do their work while the body is sent
+            try:
+                async for chunk in body:
+                    yield chunk
+            finally:
+                await _off_loop(finish)
+
+        response.body_iterator = profiled_body()
+        response.headers["X-Profile-Id"] = profile_id
+        return response
+
+
+@app.get("/admin/profiles")
+async def list_profiles(x_admin_token: Optional[str] = Header(None)):
+    """Stored request profiles, newest first (requires FISH_PROFILING=1)."""
+    if not PROFILING:
+        raise HTTPException(status_code=404, detail="Profiling is disabled (set FISH_PROFILING=1)")
+    _require_admin(x_admin_token)
+    profiles = await run_in_threadpool(profile_store.list)
+    return {"success": True, "count": len(profiles), "profiles": profiles}
+
+
+@app.get("/admin/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str, x_admin_token: Optional[str] = Header(None)):
+    """
+    One request profile as collapsed stacks (`frame;frame;frame count` per
+    line), for flamegraph.pl or speedscope.
+    """
+    if not PROFILING:
+        raise HTTPException(status_code=404, detail="Profiling is disabled (set FISH_PROFILING=1)")
+    _require_admin(x_admin_token)
+    collapsed = await run_in_threadpool(profile_store.collapsed, profile_id)
+    if collapsed is None:
+        raise HTTPException(status_code=404, detail=f"No profile {profile_id}")
+    return PlainTextResponse(collapsed)
+
+
+if __name__ == "__main__":
+    # Same as `python serve.py` (start_api.py is the auto-reloading development server)
+    from serve import main
 
+    main()
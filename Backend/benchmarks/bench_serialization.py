@@ -0,0 +1,95 @@
+"""
+Benchmark: /heatmap response serialization.
+
+Compares, for a synthetic heatmap of N points:
+- "pydantic":  the default FastAPI path (validate against HeatmapResponse,
+               jsonable_encoder, stdlib json)
+- "points":    the fast path, the same points encoded directly (fast_json.dumps)
+- "columnar":  the fast path with format="columnar" (parallel arrays)
+
+and checks that "pydantic" and "points" produce the same JSON document.
+
+    python Backend/benchmarks/bench_serialization.py --sizes 10000 100000 1000000
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+
+# Add the Backend directory to path to import the API modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from api import HeatmapResponse
+from fast_json import dumps, orjson
+
+
+def _payload(n_points: int, columnar: bool, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    lat = rng.uniform(8.0, 23.0, n_points)
+    lon = rng.uniform(68.0, 89.0, n_points)
+    value = rng.random(n_points)
+    payload = {
+        "success": True,
+        "state": "Synthetic",
+        "river_name": "Bench River",
+        "weight": "juvenile_risk_prob",
+        "count": n_points,
+    }
+    if columnar:
+        payload["columns"] = {"lat": lat, "lon": lon, "value": value}
+    else:
+        payload["points"] = [
+            {"lat": la, "lon": lo, "value": v}
+            for la, lo, v in zip(lat.tolist(), lon.tolist(), value.tolist())
+        ]
+    return payload
+
+
+def pydantic_path(payload) -> bytes:
+    """What FastAPI does for a dict returned from a response_model endpoint."""
+    validated = HeatmapResponse.model_validate(payload)
+    content = jsonable_encoder(validated.model_dump(mode="json"))
+    return json.dumps(content, ensure_ascii=False, allow_nan=True, separators=(",", ":")).encode("utf-8")
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /heatmap response serialization")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"encoder: {'orjson ' + orjson.__version__ if orjson is not None else 'stdlib json'}")
+    print(f"{'points':>10} {'pydantic s':>11} {'points s':>9} {'columnar s':>11} {'speedup':>8} {'KB rows':>9} {'KB cols':>9}")
+    for n in args.sizes:
+        rows = _payload(n, columnar=False)
+        cols = _payload(n, columnar=True)
+
+        slow, fast = pydantic_path(rows), dumps(rows)
+        assert json.loads(slow) == json.loads(fast), "fast path output differs"
+        columnar_size = len(dumps(cols))
+
+        t_slow = _best_of(lambda: pydantic_path(rows), args.repeat)
+        t_fast = _best_of(lambda: dumps(rows), args.repeat)
+        t_cols = _best_of(lambda: dumps(cols), args.repeat)
+        print(
+            f"{n:>10} {t_slow:>11.4f} {t_fast:>9.4f} {t_cols:>11.4f} "
+            f"{t_slow / t_fast:>7.1f}x {len(fast) / 1024:>9.0f} {columnar_size / 1024:>9.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
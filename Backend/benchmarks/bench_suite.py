@@ -0,0 +1,353 @@
+"""
+Benchmark suite: the pipeline and the HTTP API at several dataset sizes.
+
+For every size a synthetic dataset is generated (see synthetic_data.py; kept
+in --data-dir and reused by later runs) and, in a fresh process so peak
+memory is per size:
+
+- load_and_preprocess, train_zone_classifier (on at most --train-rows rows),
+  build_group_index
+- generate_advisories_for_state and generate_heatmap_points on the
+  --pairs most populous (state, river) pairs
+- API startup and the HTTP endpoints through an in-process TestClient
+  (no network), with the response cache off; /advisory and /heatmap are
+  also timed with it on (cached)
+
+Each stage records wall time and the process's peak RSS after it (with
+--tracemalloc also the peak of Python allocations within the stage).
+Results are written as JSON together with the commit, the library versions
+and the machine, so runs can be compared between commits:
+
+    python Backend/benchmarks/bench_suite.py --sizes 10000 100000 1000000 --out bench.json
+    python Backend/benchmarks/bench_suite.py --sizes 10000 100000 --out new.json --compare bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+# Add the Backend directory to path to import the API modules
+sys.path.insert(0, str(BACKEND_DIR))
+
+from synthetic_data import write_dataset
+
+REPORT_VERSION = 1
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+@contextmanager
+def _stage(results: Dict[str, Any], name: str, trace: bool) -> Iterator[Dict[str, Any]]:
+    entry: Dict[str, Any] = {}
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        yield entry
+    finally:
+        entry["seconds"] = time.perf_counter() - start
+        if trace:
+            entry["py_peak_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+        entry["peak_rss_mb"] = _peak_rss_mb()
+        results[name] = entry
+
+
+def _latency(samples: List[float]) -> Dict[str, Any]:
+    ms = np.asarray(samples) * 1e3
+    return {
+        "calls": len(ms),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "max_ms": float(ms.max()),
+    }
+
+
+def _timed_calls(fn, args_list: List[tuple], repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        for args in args_list:
+            start = time.perf_counter()
+            fn(*args)
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def run_size(
+    n_rows: int,
+    data_dir: Path,
+    seed: int = 0,
+    train_rows: int = 200_000,
+    n_pairs: int = 5,
+    requests: int = 50,
+    trace: bool = False,
+) -> Dict[str, Any]:
+    """Benchmark one dataset size in this process."""
+    from ML.fish_advisory_pipeline import (
+        FeatureTransformer,
+        build_group_index,
+        generate_advisories_for_state,
+        generate_heatmap_points,
+        load_and_preprocess,
+        train_zone_classifier,
+    )
+
+    result: Dict[str, Any] = {"rows": n_rows}
+    stages: Dict[str, Any] = {}
+
+    csv_path = data_dir / f"synthetic_{n_rows}_{seed}.csv"
+    start = time.perf_counter()
+    if not csv_path.exists():
+        write_dataset(str(csv_path), n_rows, seed)
+        result["generate_seconds"] = time.perf_counter() - start
+    result["dataset_mb"] = csv_path.stat().st_size / 1e6
+
+    with _stage(stages, "load_and_preprocess", trace):
+        transformer = FeatureTransformer()
+        X, y, pre, df_full = load_and_preprocess(str(csv_path), transformer)
+
+    # Training cost grows with rows and trees; larger sets train on a sample
+    if len(X) > train_rows:
+        rows = np.sort(np.random.default_rng(seed).choice(len(X), train_rows, replace=False))
+        X_train, y_train = X.iloc[rows], y.iloc[rows]
+    else:
+        X_train, y_train = X, y
+    result["train_rows"] = len(X_train)
+    with _stage(stages, "train_zone_classifier", trace):
+        model, eval_results = train_zone_classifier(X_train, y_train, pre)
+
+    with _stage(stages, "build_group_index", trace):
+        index = build_group_index(df_full)
+
+    counts = df_full.groupby(["state", "river_name"], observed=True).size()
+    pairs = [tuple(map(str, pair)) for pair in counts.nlargest(n_pairs).index]
+    result["pairs"] = [{"state": s, "river_name": r, "rows": int(counts[(s, r)])} for s, r in pairs]
+
+    with _stage(stages, "generate_advisories_for_state", trace) as entry:
+        entry.update(
+            _latency(
+                _timed_calls(
+                    lambda s, r: generate_advisories_for_state(model, df_full, s, r), pairs, 1
+                )
+            )
+        )
+    with _stage(stages, "generate_heatmap_points", trace) as entry:
+        entry.update(
+            _latency(
+                _timed_calls(
+                    lambda s, r: generate_heatmap_points(df_full, s, r, index=index), pairs, 3
+                )
+            )
+        )
+    result["stages"] = stages
+    result["endpoints"] = _bench_http(
+        csv_path, data_dir, model, eval_results, transformer, df_full, pairs, requests, trace, stages
+    )
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+
+def _bench_http(
+    csv_path, data_dir, model, eval_results, transformer, df_full, pairs, requests, trace, stages
+) -> Dict[str, Any]:
+    from ML.model_store import data_fingerprint, save_model
+
+    # Serve the model trained above instead of retraining on startup
+    model_dir = data_dir / f"{csv_path.stem}_model"
+    save_model(model, eval_results, data_fingerprint(str(csv_path)), str(model_dir), transformer)
+    os.environ["FISH_DATA_PATH"] = str(csv_path)
+    os.environ["FISH_MODEL_DIR"] = str(model_dir)
+    os.environ["FISH_RESPONSE_CACHE_SIZE"] = "0"
+
+    from fastapi.testclient import TestClient
+
+    import api
+    from response_cache import ResponseCache
+
+    endpoints: Dict[str, Any] = {}
+    first = df_full.iloc[0]
+    calls = {
+        "POST /advisory": lambda c, s, r: c.post("/advisory", json={"state": s, "river_name": r}),
+        "POST /advisory?stream=true": lambda c, s, r: c.post(
+            "/advisory?stream=true", json={"state": s, "river_name": r}
+        ),
+        "POST /heatmap": lambda c, s, r: c.post("/heatmap", json={"state": s, "river_name": r}),
+        "POST /heatmap columnar": lambda c, s, r: c.post(
+            "/heatmap", json={"state": s, "river_name": r, "format": "columnar"}
+        ),
+        "GET /heatmap/tiles": lambda c, s, r: c.get(
+            "/heatmap/tiles/4/11/7", params={"state": s, "river_name": r}
+        ),
+        "GET /advisory/nearby": lambda c, s, r: c.get(
+            "/advisory/nearby",
+            params={"lat": float(first["latitude"]), "lon": float(first["longitude"]), "radius_km": 50},
+        ),
+        "GET /states": lambda c, s, r: c.get("/states"),
+    }
+
+    client = TestClient(api.app)
+    with _stage(stages, "api_startup", trace):
+        client.__enter__()
+    try:
+        per_pair = max(1, requests // len(pairs))
+        for name, call in calls.items():
+            def timed(s, r, call=call):
+                response = call(client, s, r)
+                assert response.status_code in (200, 404), f"{name}: {response.status_code}"
+            endpoints[name] = _latency(_timed_calls(timed, pairs, per_pair))
+
+        api.response_cache = ResponseCache(max_entries=256)
+        for name in ("POST /advisory", "POST /heatmap"):
+            call = calls[name]
+            for s, r in pairs:
+                call(client, s, r)
+            endpoints[f"{name} (cached)"] = _latency(
+                _timed_calls(lambda s, r, call=call: call(client, s, r), pairs, per_pair)
+            )
+    finally:
+        client.__exit__(None, None, None)
+    return endpoints
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", *args], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=30, check=True
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip()
+
+
+def _environment() -> Dict[str, Any]:
+    import fastapi
+    import pandas
+    import sklearn
+
+    status = _git("status", "--porcelain", "--untracked-files=no")
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(status) if status is not None else None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pandas.__version__,
+        "sklearn": sklearn.__version__,
+        "fastapi": fastapi.__version__,
+    }
+
+
+def compare(new: Dict[str, Any], old: Dict[str, Any]) -> None:
+    """Print new/old ratios of stage times and endpoint p50 latencies per size."""
+    old_by_rows = {r["rows"]: r for r in old["results"]}
+    print(f"\nvs {old['environment'].get('commit')} (ratio < 1 is faster)")
+    for res in new["results"]:
+        base = old_by_rows.get(res["rows"])
+        if base is None:
+            continue
+        print(f"rows={res['rows']:,}")
+        for name, stage in res["stages"].items():
+            if name in base["stages"]:
+                print(f"  {name:<34} {stage['seconds']:9.3f}s  x{stage['seconds'] / base['stages'][name]['seconds']:.2f}")
+        for name, lat in res["endpoints"].items():
+            if name in base["endpoints"]:
+                print(f"  {name:<34} {lat['p50_ms']:8.2f}ms  x{lat['p50_ms'] / base['endpoints'][name]['p50_ms']:.2f}")
+
+
+def _print_result(res: Dict[str, Any]) -> None:
+    print(f"rows={res['rows']:,} (trained on {res['train_rows']:,}), peak RSS {res['peak_rss_mb']} MB")
+    for name, stage in res["stages"].items():
+        extra = f"  p50 {stage['p50_ms']:.2f}ms" if "p50_ms" in stage else ""
+        print(f"  {name:<34} {stage['seconds']:9.3f}s  peak RSS {stage['peak_rss_mb']} MB{extra}")
+    for name, lat in res["endpoints"].items():
+        print(f"  {name:<34} p50 {lat['p50_ms']:8.2f}ms  p95 {lat['p95_ms']:8.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline and API benchmark suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--out", type=str, default="bench_report.json", help="JSON report path.")
+    parser.add_argument("--compare", type=str, default=None, help="Earlier report to compare against.")
+    parser.add_argument(
+        "--data-dir",
+        type=str,
+        default=str(Path(tempfile.gettempdir()) / "fish-bench"),
+        help="Where synthetic datasets are generated and reused.",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--train-rows", type=int, default=200_000)
+    parser.add_argument("--pairs", type=int, default=5, help="(state, river) pairs to query.")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per endpoint.")
+    parser.add_argument("--tracemalloc", action="store_true", help="Also trace Python allocations (slower).")
+    parser.add_argument("--worker", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    data_dir = Path(args.data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    options = dict(
+        seed=args.seed,
+        train_rows=args.train_rows,
+        n_pairs=args.pairs,
+        requests=args.requests,
+        trace=args.tracemalloc,
+    )
+
+    if args.worker is not None:
+        # One size, in a process of its own; the parent reads the JSON
+        result = run_size(args.worker, data_dir, **options)
+        Path(args.out).write_text(json.dumps(result), encoding="utf-8")
+        return
+
+    report = {
+        "version": REPORT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": _environment(),
+        "options": {**options, "sizes": args.sizes},
+        "results": [],
+    }
+    for n_rows in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            worker_out = Path(tmp) / "result.json"
+            cmd = [
+                sys.executable, __file__, "--worker", str(n_rows), "--out", str(worker_out),
+                "--data-dir", str(data_dir), "--seed", str(args.seed),
+                "--train-rows", str(args.train_rows), "--pairs", str(args.pairs),
+                "--requests", str(args.requests),
+            ] + (["--tracemalloc"] if args.tracemalloc else [])
+            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+            result = json.loads(worker_out.read_text(encoding="utf-8"))
+        _print_result(result)
+        report["results"].append(result)
+
+    Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Report written to {args.out}")
+    if args.compare:
+        compare(report, json.loads(Path(args.compare).read_text(encoding="utf-8")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Synthetic fisheries datasets with the schema of `converted_final.csv`, at any size.
+
+Rows are drawn with replacement from the bundled CSV, so the joint
+distribution of state, river, species, season, gear and zone label is the
+real one (species keep their legal size, juvenile range and disease
+patterns); the continuous measurements (position, temperature, chlorophyll,
+depth, price) are jittered so rows are not exact duplicates. Output is
+deterministic for a given (rows, seed) and written in chunks, so 10M rows
+never have to fit in memory at once.
+
+    python Backend/benchmarks/synthetic_data.py --rows 1000000 --out /tmp/fish_1m.csv
+"""
+
+import argparse
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+BUNDLED_DATA_PATH = Path(__file__).parent.parent / "converted_final.csv"
+
+# column -> (kind, scale, decimals, lower bound); "abs" adds N(0, scale),
+# "rel" multiplies by N(1, scale)
+JITTER = {
+    "latitude": ("abs", 0.02, 4, None),
+    "longitude": ("abs", 0.02, 4, None),
+    "sea_surface_temp_C": ("abs", 0.3, 2, None),
+    "chlorophyll_mg_m3": ("rel", 0.05, 2, 0.01),
+    "depth_m": ("rel", 0.02, 1, 0.5),
+    "economic_value_in_INR_per_kg": ("rel", 0.02, 2, 1.0),
+}
+
+
+def generate_dataset(
+    n_rows: int, seed: int = 0, template: Optional[pd.DataFrame] = None, chunk_no: int = 0
+) -> pd.DataFrame:
+    """`n_rows` synthetic rows bootstrapped from `template` (default: the bundled CSV)."""
+    if template is None:
+        template = pd.read_csv(BUNDLED_DATA_PATH)
+    rng = np.random.default_rng([seed, chunk_no])
+    df = template.iloc[rng.integers(0, len(template), n_rows)].reset_index(drop=True)
+    for col, (kind, scale, decimals, lower) in JITTER.items():
+        values = df[col].to_numpy(dtype=np.float64)
+        noise = rng.normal(0.0, scale, n_rows)
+        values = values + noise if kind == "abs" else values * (1.0 + noise)
+        if lower is not None:
+            values = np.maximum(values, lower)
+        # NaNs in the template stay NaN
+        df[col] = np.round(values, decimals)
+    return df
+
+
+def write_dataset(path: str, n_rows: int, seed: int = 0, chunk_rows: int = 500_000) -> Path:
+    """Write `n_rows` synthetic rows as CSV to `path`, `chunk_rows` at a time."""
+    template = pd.read_csv(BUNDLED_DATA_PATH)
+    out = Path(path)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(out.name + ".tmp")
+    written = 0
+    chunk_no = 0
+    with open(tmp, "w", encoding="utf-8", newline="") as fh:
+        while written < n_rows:
+            n = min(chunk_rows, n_rows - written)
+            chunk = generate_dataset(n, seed, template, chunk_no)
+            chunk.to_csv(fh, index=False, header=chunk_no == 0)
+            written += n
+            chunk_no += 1
+    tmp.replace(out)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic fisheries dataset")
+    parser.add_argument("--rows", type=int, required=True)
+    parser.add_argument("--out", type=str, required=True, help="Output CSV path.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    out = write_dataset(args.out, args.rows, args.seed)
+    print(f"Wrote {args.rows:,} rows to {out} ({out.stat().st_size / 1e6:.1f} MB) in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
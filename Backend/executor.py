@@ -0,0 +1,110 @@
+"""
+Executor layer for CPU-bound request work.
+
+Endpoints hand synchronous pandas/sklearn work to a bounded pool instead of
+running it on the asyncio event loop, so one slow request cannot stall
+/health and every other in-flight request on the worker. When the pool is
+saturated, callers get `ExecutorSaturated` and respond with 503 right away
+rather than queueing without limit.
+
+Configuration (environment variables):
+- FISH_EXECUTOR_THREADS: thread pool size (default: min(4, CPU count))
+- FISH_EXECUTOR_QUEUE: max jobs running or waiting across both pools (default: 32)
+- FISH_EXECUTOR_PROCESSES: process pool size for heavy batches (default: 0 = disabled,
+  heavy jobs then run on the thread pool)
+"""
+
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+
+class ExecutorSaturated(RuntimeError):
+    """Raised when the executor already holds its maximum number of jobs."""
+
+
+class WorkExecutor:
+    """
+    A thread pool (numpy/sklearn release the GIL for most of their work) plus
+    an optional process pool for heavy batches, behind one bounded queue.
+    """
+
+    def __init__(
+        self,
+        threads: int = 4,
+        max_pending: int = 32,
+        processes: int = 0,
+    ):
+        self.threads = max(1, threads)
+        self.max_pending = max(1, max_pending)
+        self.processes = max(0, processes)
+        self._thread_pool = ThreadPoolExecutor(
+            max_workers=self.threads, thread_name_prefix="fish-work"
+        )
+        self._process_pool: Optional[Executor] = (
+            ProcessPoolExecutor(max_workers=self.processes) if self.processes else None
+        )
+        # Only touched from the event loop thread, so a plain counter is enough
+        self._pending = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_env(cls) -> "WorkExecutor":
+        return cls(
+            threads=int(os.getenv("FISH_EXECUTOR_THREADS", min(4, os.cpu_count() or 1))),
+            max_pending=int(os.getenv("FISH_EXECUTOR_QUEUE", "32")),
+            processes=int(os.getenv("FISH_EXECUTOR_PROCESSES", "0")),
+        )
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def run(self, fn: Callable[..., Any], *args: Any, heavy: bool = False, **kwargs: Any) -> Any:
+        """
+        Run `fn(*args, **kwargs)` off the event loop and return its result.
+
+        `heavy=True` sends the job to the process pool when one is configured;
+        the function and its arguments must then be picklable.
+        """
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise ExecutorSaturated(
+                f"Server busy: {self._pending} jobs already queued (limit {self.max_pending})."
+            )
+
+        pool = self._process_pool if heavy and self._process_pool is not None else self._thread_pool
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(pool, partial(fn, *args, **kwargs))
+        finally:
+            self._pending -= 1
+
+    def reset_process_pool(self) -> None:
+        """
+        Replace the process pool with fresh workers, e.g. after the model was
+        reloaded: forked workers hold the state of the moment they started.
+        Jobs already running on the old pool still finish.
+        """
+        if self._process_pool is None:
+            return
+        old = self._process_pool
+        self._process_pool = ProcessPoolExecutor(max_workers=self.processes)
+        old.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "threads": self.threads,
+            "processes": self.processes,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        self._thread_pool.shutdown(wait=False, cancel_futures=True)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,53 @@
+"""
+Fast JSON responses for large, already-validated payloads.
+
+FastAPI validates a returned dict against the endpoint's `response_model`,
+converts it with `jsonable_encoder` and encodes it with the stdlib `json`
+module. For payloads built from our own arrays (heatmap points, precomputed
+advisories) the validation adds nothing and dominates the response time.
+Endpoints encode such payloads with `dumps` (or `dumps_with`, to splice in a
+cached, already-encoded member) and return the bytes in a plain `Response`,
+which FastAPI sends as-is; the `response_model` still documents the schema
+in OpenAPI.
+
+orjson is used when installed (it also encodes NumPy arrays directly);
+otherwise the stdlib encoder is used with compact separators.
+"""
+
+import json
+from typing import Any, Dict
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode `content` (dicts, lists, scalars, NumPy arrays) as UTF-8 JSON."""
+    if orjson is not None:
+        # orjson writes NaN/Infinity as null (the stdlib emits non-standard NaN)
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, allow_nan=True, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def dumps_with(content: Dict[str, Any], key: str, encoded: bytes) -> bytes:
+    """
+    `dumps({**content, key: value})`, given `encoded = dumps(value)`: lets an
+    encoded (e.g. cached) member be reused without encoding it again.
+    """
+    head = dumps(content)
+    sep = b"," if len(head) > 2 else b""
+    return head[:-1] + sep + dumps(key) + b":" + encoded + b"}"
@@ -0,0 +1,205 @@
+"""
+Request and pipeline-stage metrics in the Prometheus text format.
+
+A small self-contained registry (no client library needed): histograms
+updated in process, plus callback metrics whose samples are read when
+/metrics is scraped (model version, response cache, executor). Stage
+timings come from the pipeline's `span` hook (`set_span_recorder`), so
+`generate_advisories_for_state`, `generate_heatmap_points` and model loading
+report where their time goes.
+
+Configuration (environment variables):
+- FISH_METRICS: set to 0 to disable metrics; no middleware or span recorder
+  is installed then, and /metrics returns 404 (default: 1)
+
+With several workers (serve.py), every worker keeps its own metrics; a
+scrape sees the worker that answered it.
+"""
+
+import math
+import os
+import threading
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds, from sub-millisecond lookups to full reloads
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+ROW_BUCKETS = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[Dict[str, Any], float]
+
+
+def metrics_enabled() -> bool:
+    return os.getenv("FISH_METRICS", "1").lower() not in ("0", "false", "no")
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[Any]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (non-cumulative, + overflow), sum]
+        self._series: Dict[LabelValues, List[Any]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        # First bucket >= value; len(buckets) is the +Inf bucket
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][slot] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._series.items()]
+        lines = self.header()
+        bucket_names = self.labelnames + ("le",)
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{_labels(bucket_names, key + (_number(bound),))} {cumulative}"
+                )
+            labels = _labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_number(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """A gauge or counter whose samples are produced by `collect()` at scrape time."""
+
+    def __init__(self, name: str, help: str, kind: str, collect: Callable[[], Iterable[Sample]]):
+        super().__init__(name, help)
+        self.kind = kind
+        self._collect = collect
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, value in self._collect():
+            if value is None:
+                continue
+            lines.append(f"{self.name}{_labels(list(labels), list(labels.values()))} {_number(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def callback(
+        self, name: str, help: str, collect: Callable[[], Iterable[Sample]], kind: str = "gauge"
+    ) -> CallbackMetric:
+        return self.register(CallbackMetric(name, help, kind, collect))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                # One failing callback must not take the whole scrape down
+                lines.append(f"# {metric.name} unavailable: {type(e).__name__}")
+        return "\n".join(lines) + "\n"
+
+
+class PipelineMetrics:
+    """The registry the API exposes, with the request and stage metrics it records."""
+
+    def __init__(self):
+        self.registry = Registry()
+        self.requests = self.registry.histogram(
+            "fish_request_duration_seconds",
+            "HTTP request latency until the response starts, by route.",
+            ("method", "endpoint", "status", "data_version"),
+        )
+        self.stages = self.registry.histogram(
+            "fish_stage_duration_seconds",
+            "Time spent in each pipeline stage (see `span`).",
+            ("stage",),
+        )
+        self.stage_rows = self.registry.histogram(
+            "fish_stage_rows",
+            "Rows handled per pipeline stage call (e.g. rows matching a query).",
+            ("stage",),
+            buckets=ROW_BUCKETS,
+        )
+
+    def record_span(self, stage: str, seconds: float, rows: Optional[int]) -> None:
+        """Recorder for `set_span_recorder`."""
+        self.stages.observe(seconds, stage=stage)
+        if rows is not None:
+            self.stage_rows.observe(rows, stage=stage)
+
+    def observe_request(
+        self, method: str, endpoint: str, status: int, data_version: Any, seconds: float
+    ) -> None:
+        self.requests.observe(
+            seconds, method=method, endpoint=endpoint, status=status, data_version=data_version
+        )
@@ -0,0 +1,186 @@
+"""
+On-demand profiling of single requests in a running server.
+
+`SamplingProfiler` is a small stdlib-only sampling profiler: a background
+thread reads the stacks of the threads it watches (`sys._current_frames`)
+every `interval` seconds and counts identical stacks. The result is written
+in the collapsed ("folded") stack format, one `frame;frame;frame count` line
+per stack, which flamegraph.pl, speedscope (https://www.speedscope.app) and
+most flamegraph viewers read directly.
+
+`ProfileStore` keeps the most recent profiles on disk, each as a `.folded`
+file plus a `.json` summary (request, status, duration, samples).
+
+Configuration (environment variables):
+- FISH_PROFILING: set to 1 to allow profiling requests with `?profile=1` or
+  an `X-Profile: 1` header (default: 0, the flag is ignored)
+- FISH_PROFILE_DIR: where profiles are stored (default: fish-profiles in the temp directory)
+- FISH_PROFILE_INTERVAL_MS: sampling interval (default: 2)
+- FISH_PROFILE_KEEP: number of profiles kept (default: 50)
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Samples whose innermost frame is in one of these modules (or is one of these
+# functions) are idle threads waiting for work or I/O, not time spent on the request
+_IDLE_MODULES = ("threading.py", "selectors.py", "queue.py")
+_IDLE_FUNCTIONS = {("thread.py", "_worker")}
+
+
+def _is_idle(code) -> bool:
+    filename = code.co_filename
+    if filename.endswith(_IDLE_MODULES):
+        return True
+    return (Path(filename).name, code.co_name) in _IDLE_FUNCTIONS
+
+
+def profiling_enabled() -> bool:
+    return os.getenv("FISH_PROFILING", "0").lower() in ("1", "true", "yes")
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of the main thread of interest plus any thread whose
+    name passes `include_thread` (e.g. executor workers) until stopped.
+    """
+
+    def __init__(
+        self,
+        thread_id: int,
+        include_thread: Optional[Callable[[str], bool]] = None,
+        interval: float = 0.002,
+    ):
+        self.thread_id = thread_id
+        self.include_thread = include_thread
+        self.interval = interval
+        self.samples = 0
+        self.started: Optional[float] = None
+        self.stopped: Optional[float] = None
+        self._counts: "Counter[Tuple[str, ...]]" = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SamplingProfiler":
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="fish-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.stopped = time.perf_counter()
+
+    def _watched(self) -> Dict[int, str]:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        watched = {self.thread_id: names.get(self.thread_id, "main")}
+        if self.include_thread is not None:
+            watched.update(
+                (ident, name) for ident, name in names.items() if self.include_thread(name)
+            )
+        return watched
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            self.samples += 1
+            # Re-read every time: pool threads are started on first use
+            for ident, name in self._watched().items():
+                frame = frames.get(ident)
+                if frame is None or _is_idle(frame.f_code):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(name)
+                self._counts[tuple(reversed(stack))] += 1
+
+    @property
+    def duration(self) -> Optional[float]:
+        if self.started is None or self.stopped is None:
+            return None
+        return self.stopped - self.started
+
+    def collapsed(self) -> str:
+        """The samples in collapsed stack format, heaviest stacks first."""
+        return "".join(
+            f"{';'.join(frame.replace(';', ':') for frame in stack)} {count}\n"
+            for stack, count in self._counts.most_common()
+        )
+
+
+class ProfileStore:
+    """The `keep` most recent profiles in `directory`."""
+
+    def __init__(self, directory: str, keep: int = 50):
+        self.directory = Path(directory)
+        self.keep = max(1, keep)
+
+    @classmethod
+    def from_env(cls) -> "ProfileStore":
+        return cls(
+            os.getenv("FISH_PROFILE_DIR", str(Path(tempfile.gettempdir()) / "fish-profiles")),
+            keep=int(os.getenv("FISH_PROFILE_KEEP", "50")),
+        )
+
+    @staticmethod
+    def new_id() -> str:
+        """Sortable by creation time (milliseconds), unique by a random suffix."""
+        now = time.time()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now))
+        return f"{stamp}{int(now * 1000) % 1000:03d}-{uuid.uuid4().hex[:8]}"
+
+    def save(self, profile_id: str, profiler: SamplingProfiler, info: Dict[str, Any]) -> Dict[str, Any]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        summary = {
+            "id": profile_id,
+            **info,
+            "duration_s": profiler.duration,
+            "samples": profiler.samples,
+            "interval_s": profiler.interval,
+            "format": "collapsed",
+        }
+        (self.directory / f"{profile_id}.folded").write_text(profiler.collapsed(), encoding="utf-8")
+        (self.directory / f"{profile_id}.json").write_text(json.dumps(summary), encoding="utf-8")
+        self._prune()
+        return summary
+
+    def _prune(self) -> None:
+        summaries = sorted(self.directory.glob("*.json"))
+        for old in summaries[: max(0, len(summaries) - self.keep)]:
+            old.unlink(missing_ok=True)
+            old.with_suffix(".folded").unlink(missing_ok=True)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Summaries of the stored profiles, newest first."""
+        if not self.directory.exists():
+            return []
+        out = []
+        for path in sorted(self.directory.glob("*.json"), reverse=True):
+            try:
+                out.append(json.loads(path.read_text(encoding="utf-8")))
+            except (OSError, ValueError):
+                continue
+        return out
+
+    def collapsed(self, profile_id: str) -> Optional[str]:
+        # Ids are generated by new_id; anything else cannot name a stored profile
+        if not profile_id.replace("-", "").isalnum():
+            return None
+        path = self.directory / f"{profile_id}.folded"
+        return path.read_text(encoding="utf-8") if path.exists() else None
@@ -0,0 +1,115 @@
+"""
+Background reloads of the served model state.
+
+A `Reloader` runs a build function (load data, train or load the model,
+build the indexes) on its own thread and hands the result to an install
+function that swaps it in with a single assignment. Requests keep using the
+state they started with, so a reload never produces an error window; if the
+build fails, the current state simply stays in place.
+
+Reloads are triggered explicitly (the /admin/reload endpoint) or by `watch`,
+which polls a file (the dataset, or the shared-state manifest) for changes.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+def file_stamp(path: str) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) of `path`, or None if it cannot be read."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class Reloader:
+    """Runs at most one reload at a time; triggers during a reload join it."""
+
+    def __init__(self, build: Callable[[], Any], install: Callable[[Any], None]):
+        self._build = build
+        self._install = install
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fish-reload")
+        self._lock = threading.Lock()
+        self._current: Optional[Future] = None
+        self.reloads = 0
+        self.failures = 0
+        self.last_started: Optional[float] = None
+        self.last_finished: Optional[float] = None
+        self.last_duration_s: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def in_progress(self) -> bool:
+        return self._current is not None and not self._current.done()
+
+    def trigger(self) -> Future:
+        """Start a reload, or return the one already running."""
+        with self._lock:
+            if self._current is None or self._current.done():
+                self._current = self._pool.submit(self._run)
+            return self._current
+
+    def _run(self) -> None:
+        start = time.time()
+        self.last_started = start
+        try:
+            state = self._build()
+            self._install(state)
+        except Exception as e:
+            self.failures += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"Reload failed, keeping the current model: {self.last_error}")
+            raise
+        else:
+            self.reloads += 1
+            self.last_error = None
+        finally:
+            self.last_finished = time.time()
+            self.last_duration_s = self.last_finished - start
+
+    async def watch(self, path: Callable[[], str], interval: float = 5.0) -> None:
+        """
+        Poll `path()` every `interval` seconds and reload when the file changes.
+
+        A change is acted on once the file has stopped changing for one
+        interval, so a dataset that is still being written is not loaded
+        half-way. Runs until cancelled.
+        """
+        seen = file_stamp(path())
+        pending = None
+        while True:
+            await asyncio.sleep(interval)
+            stamp = file_stamp(path())
+            if stamp is None or stamp == seen:
+                pending = None
+                continue
+            if stamp != pending:
+                pending = stamp
+                continue
+            print(f"{path()} changed, reloading...")
+            try:
+                await asyncio.wrap_future(self.trigger())
+            except Exception:
+                # Reported by _run; retried when the file changes again
+                pass
+            seen, pending = stamp, None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "in_progress": self.in_progress,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_started": self.last_started,
+            "last_finished": self.last_finished,
+            "last_duration_s": self.last_duration_s,
+            "last_error": self.last_error,
+        }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
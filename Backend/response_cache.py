@@ -0,0 +1,138 @@
+"""
+In-process response cache with request coalescing.
+
+Popular (state, river) pairs are requested by many clients at once, and
+every request would compute the same answer. `ResponseCache` keeps computed
+results in an LRU bounded by entry count and age (TTL). Concurrent misses
+for the same key share one computation (single-flight): the first request
+starts it as a task, and the others await that task instead of starting
+their own.
+
+Keys are chosen by the caller and should include the data version, so a
+reload never serves stale answers; `clear` additionally drops everything
+at once, including computations still running for the old version.
+
+Configuration (environment variables):
+- FISH_RESPONSE_CACHE_SIZE: maximum cached responses (default: 256, 0 disables the cache)
+- FISH_RESPONSE_CACHE_TTL: seconds a response stays valid (default: 300)
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+HIT = "HIT"
+MISS = "MISS"
+COALESCED = "COALESCED"
+
+
+class ResponseCache:
+    """LRU + TTL cache of computed responses; coalesces identical concurrent misses."""
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 300.0):
+        self.max_entries = max(0, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        # clear() is called from the reload thread, everything else on the event loop
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        return cls(
+            max_entries=int(os.getenv("FISH_RESPONSE_CACHE_SIZE", "256")),
+            ttl_seconds=float(os.getenv("FISH_RESPONSE_CACHE_TTL", "300")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    async def get_or_compute(
+        self, key: Hashable, compute: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, str]:
+        """
+        Return `(value, status)` for `key`, where status is HIT, MISS or COALESCED.
+
+        On a miss `compute()` is awaited once for all concurrent callers. If
+        it raises, every waiting caller gets the exception and nothing is
+        cached. A caller that is cancelled (e.g. the client disconnected)
+        does not cancel the computation for the others.
+        """
+        if not self.enabled:
+            return await compute(), MISS
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if time.monotonic() - entry[0] < self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1], HIT
+                del self._entries[key]
+                self.expirations += 1
+
+            task = self._inflight.get(key)
+            if task is not None:
+                self.coalesced += 1
+                status = COALESCED
+            else:
+                self.misses += 1
+                status = MISS
+                task = asyncio.ensure_future(self._compute(key, compute, self._generation))
+                self._inflight[key] = task
+
+        return await asyncio.shield(task), status
+
+    async def _compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]], generation: int) -> Any:
+        try:
+            value = await compute()
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is asyncio.current_task():
+                    del self._inflight[key]
+        with self._lock:
+            # Computed for data that was replaced meanwhile: answer, but do not keep
+            if generation == self._generation:
+                self._entries[key] = (time.monotonic(), value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def clear(self) -> None:
+        """Drop every entry; computations still running are not cached."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._inflight.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else None,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,128 @@
+"""
+Production launcher for the Fish Advisory API.
+
+Prepares the model, the preprocessed dataset columns and the row scores once
+as memory-mappable files (see ML/shared_store.py), then starts uvicorn with
+several worker processes that map that state read-only. Workers share one
+copy of the data in memory and start without reading the CSV or training.
+
+With --watch, the launcher rebuilds the shared state whenever the dataset
+file or the saved model (e.g. from ML/model_search.py) changes, and every worker re-maps it once the new manifest is written
+(hot reload without restarting workers).
+
+For local development with auto-reload, use start_api.py instead.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import uvicorn
+
+BACKEND_DIR = Path(__file__).parent
+
+# Add current directory to path
+sys.path.insert(0, str(BACKEND_DIR))
+
+from api import resolve_data_path, resolve_model_dir
+from ML.model_store import FINGERPRINT_FILENAME
+from ML.shared_store import prepare_shared_state
+from reloader import file_stamp
+
+
+def watch_dataset(data_path: str, model_dir: str, shared_dir: str, interval: float) -> None:
+    """
+    Rebuild the shared state when `data_path` or the model saved in
+    `model_dir` changes and has settled (runs forever).
+    """
+    model_meta = os.path.join(model_dir, FINGERPRINT_FILENAME)
+    seen = (file_stamp(data_path), file_stamp(model_meta))
+    pending = None
+    while True:
+        time.sleep(interval)
+        stamp = (file_stamp(data_path), file_stamp(model_meta))
+        if stamp[0] is None or stamp == seen:
+            pending = None
+            continue
+        if stamp != pending:
+            pending = stamp
+            continue
+        print(f"{data_path} or the model in {model_dir} changed, rebuilding shared state...")
+        start = time.perf_counter()
+        try:
+            manifest = prepare_shared_state(data_path, model_dir, shared_dir)
+            print(
+                f"Shared state rebuilt: {manifest['rows']} rows "
+                f"({time.perf_counter() - start:.2f}s); workers will switch over"
+            )
+        except Exception as e:
+            print(f"Rebuilding shared state failed, workers keep the current version: {e}")
+        seen, pending = stamp, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Fish Advisory API with multiple workers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+        help="Number of worker processes (default: WEB_CONCURRENCY or CPU count).",
+    )
+    parser.add_argument(
+        "--shared-dir",
+        default=os.getenv("FISH_SHARED_DIR", str(BACKEND_DIR / "shared_state")),
+        help="Directory for the memory-mapped model and dataset files.",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Rebuild the shared state and hot-reload the workers when the dataset or the saved model changes.",
+    )
+    parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=float(os.getenv("FISH_RELOAD_INTERVAL", "5")),
+        help="Seconds between checks of the dataset and model with --watch (default: 5).",
+    )
+    args = parser.parse_args()
+
+    data_path = resolve_data_path()
+    model_dir = resolve_model_dir()
+    print("Preparing shared model state...")
+    start = time.perf_counter()
+    manifest = prepare_shared_state(data_path, model_dir, args.shared_dir)
+    print(
+        f"Shared state ready in {args.shared_dir}: {manifest['rows']} rows, "
+        f"{len(manifest['groups'])} state/river groups ({time.perf_counter() - start:.2f}s)"
+    )
+
+    # Workers inherit this and map the prepared files instead of loading the CSV
+    os.environ["FISH_SHARED_DIR"] = str(Path(args.shared_dir).resolve())
+
+    if args.watch:
+        # Workers follow the manifest; the launcher follows the dataset
+        os.environ["FISH_RELOAD_WATCH"] = "1"
+        os.environ["FISH_RELOAD_INTERVAL"] = str(args.watch_interval)
+        threading.Thread(
+            target=watch_dataset,
+            args=(data_path, model_dir, args.shared_dir, args.watch_interval),
+            daemon=True,
+        ).start()
+
+    print(f"\nStarting {args.workers} worker(s) on http://{args.host}:{args.port}")
+    uvicorn.run(
+        "api:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        app_dir=str(BACKEND_DIR),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -4,24 +4,47 @@ Quick test script to verify the API works with state and river inputs.
 
 import sys
 import os
+import tempfile
+import warnings
+from functools import lru_cache
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
+
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from ML.fish_advisory_pipeline import (
+    JUVENILE_RANGE_COL,
+    FeatureTransformer,
+    _parse_juvenile_range,
+    derive_features,
     load_and_preprocess,
+    parse_juvenile_ranges,
     train_zone_classifier,
     generate_advisories_for_state,
 )
+from ML.forest_compiler import CompiledForest, compile_pipeline
+
+# Small dataset shipped with the repo, used by the self-contained checks below
+BUNDLED_DATA_PATH = Path(__file__).parent / "converted_final.csv"
+
+
+@lru_cache(maxsize=1)
+def _bundled_model():
+    """Train once on the bundled CSV and share the result between checks."""
+    X, y, pre, df_full = load_and_preprocess(str(BUNDLED_DATA_PATH))
+    model, eval_results = train_zone_classifier(X, y, pre)
+    return X, model, df_full
 
 def test_api_logic():
     """Test if the API logic works correctly."""
     print("Testing API logic...")
     print("=" * 50)
     
-    # Use the default data path
-    data_path = r"c:\Users\Divyansh Saxena\Desktop\converted_final.csv"
+    # FISH_DATA_PATH if set (as for the API), otherwise the bundled CSV
+    data_path = os.getenv("FISH_DATA_PATH", str(BUNDLED_DATA_PATH))
     
     if not Path(data_path).exists():
         print(f"ERROR: Dataset file not found at: {data_path}")
@@ -75,7 +98,128 @@ def test_api_logic():
         traceback.print_exc()
         return False
 
+def test_compiled_forest_parity():
+    """The flat NumPy forest must reproduce the sklearn pipeline's predictions."""
+    X, model, _ = _bundled_model()
+    compiled = compile_pipeline(model)
+
+    expected = model.predict_proba(X)
+    got = compiled.predict_proba(X)
+    # Only the summation order of the per-tree probabilities may differ
+    assert np.allclose(expected, got, rtol=0.0, atol=1e-12)
+    assert (model.predict(X) == compiled.predict(X)).all()
+
+    # Unseen categories are ignored, as with OneHotEncoder(handle_unknown="ignore"),
+    # and must not trip pandas' deprecation of unseen values in Categorical
+    unseen = X.iloc[:5].copy()
+    unseen["state"] = "Atlantis"
+    unseen_row = X.iloc[[0]].copy()
+    for col in compiled.categorical_cols:
+        unseen_row[col] = f"unseen {col}"
+    unseen = pd.concat([unseen, unseen_row, X.iloc[5:10]])
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        got_unseen = compiled.predict_proba(unseen)
+    assert np.allclose(model.predict_proba(unseen), got_unseen, rtol=0.0, atol=1e-12)
+
+    # Saved arrays load back memory-mapped and give the same answers
+    with tempfile.TemporaryDirectory() as tmp:
+        compiled.save(tmp)
+        loaded = CompiledForest.load(tmp)
+        assert (loaded.predict_proba(X) == got).all()
+    print("[SUCCESS] Compiled forest matches the sklearn pipeline")
+
+
+def _scalar_ranges(values):
+    """Reference: the row-by-row parser, with None as NaN."""
+    pairs = [_parse_juvenile_range(v) for v in values]
+    as_float = lambda v: np.nan if v is None else v
+    return (
+        np.array([as_float(lo) for lo, _ in pairs], dtype=np.float64),
+        np.array([as_float(hi) for _, hi in pairs], dtype=np.float64),
+    )
+
+
+def test_juvenile_range_parsing_parity():
+    """The column parser must agree with `_parse_juvenile_range` on every value."""
+    values = [
+        "9.0-16.2", " 9 - 16 ", "1e2-3E+1", "+.5-1.", "\xa01.5-2\xa0",  # valid
+        "9-", "-9", "9--16", "-1-5", "1-2-3", "1.5e-3-2", "5", "", " ",  # wrong number of parts
+        "abc-def", "9.0 -16.2cm", "9.0\u201316.2", "0x1-2", ". -1",  # malformed numbers
+        "nan-5", "inf-7", "1_0-2", "\u0663-4",  # accepted by float()
+        None, np.nan, 5.0,  # missing / not a string
+        "9.0-16.2",  # repeated value
+    ]
+    series = pd.Series(values, dtype=object)
+    for got, expected in zip(parse_juvenile_ranges(series), _scalar_ranges(values)):
+        np.testing.assert_array_equal(got, expected)
+
+    raw = pd.read_csv(BUNDLED_DATA_PATH)
+    for got, expected in zip(
+        parse_juvenile_ranges(raw[JUVENILE_RANGE_COL]), _scalar_ranges(raw[JUVENILE_RANGE_COL])
+    ):
+        np.testing.assert_array_equal(got, expected)
+
+    # An all-missing column parses to NaN and still derives every feature
+    empty = raw.head(10).copy()
+    empty[JUVENILE_RANGE_COL] = np.nan
+    derived = derive_features(empty)
+    assert derived["juvenile_min_cm"].isna().all() and derived["juvenile_max_cm"].isna().all()
+    assert not derived["juvenile_dominance"].any()
+    print("[SUCCESS] Vectorized juvenile range parsing matches the row-wise parser")
+
+
+def test_median_fill_with_missing_water_type():
+    """
+    Missing numerics take their water_type's median; rows without a
+    water_type keep the values they have and stay missing otherwise.
+    """
+    raw = pd.read_csv(BUNDLED_DATA_PATH).head(20).reset_index(drop=True)
+    raw.loc[[0, 1], "water_type"] = np.nan
+    raw.loc[[1, 2], "sea_surface_temp_C"] = np.nan
+    known = raw["water_type"].notna() & raw["sea_surface_temp_C"].notna()
+    medians = raw[known].groupby("water_type")["sea_surface_temp_C"].median()
+
+    out = FeatureTransformer().fit_transform(raw)
+    # groupby("water_type").transform(...) used to turn row 0's value into NaN
+    assert out.loc[0, "sea_surface_temp_C"] == raw.loc[0, "sea_surface_temp_C"]
+    assert np.isnan(out.loc[1, "sea_surface_temp_C"])
+    assert out.loc[2, "sea_surface_temp_C"] == medians[raw.loc[2, "water_type"]]
+    assert out.loc[1, "water_type"] == "Unknown"
+    print("[SUCCESS] Median fill keeps the values of rows without a water_type")
+
+
+def test_admin_reload_requires_token():
+    """/admin/reload is closed without FISH_ADMIN_TOKEN and rejects a wrong token."""
+    from fastapi.testclient import TestClient
+
+    import api
+
+    # No `with`: startup (model loading) is not needed for the checks below
+    client = TestClient(api.app)
+    previous = os.environ.pop("FISH_ADMIN_TOKEN", None)
+    try:
+        response = client.post("/admin/reload", headers={"X-Admin-Token": "anything"})
+        assert response.status_code == 403
+        assert "disabled" in response.json()["detail"]
+
+        os.environ["FISH_ADMIN_TOKEN"] = "s3cret"
+        for headers in ({}, {"X-Admin-Token": "wrong"}):
+            response = client.post("/admin/reload", headers=headers)
+            assert response.status_code == 403
+            assert response.json()["detail"] == "Invalid admin token"
+    finally:
+        os.environ.pop("FISH_ADMIN_TOKEN", None)
+        if previous is not None:
+            os.environ["FISH_ADMIN_TOKEN"] = previous
+    print("[SUCCESS] /admin/reload rejects missing and wrong admin tokens")
+
+
 if __name__ == "__main__":
+    test_compiled_forest_parity()
+    test_juvenile_range_parsing_parity()
+    test_median_fill_with_missing_water_type()
+    test_admin_reload_requires_token()
     success = test_api_logic()
     sys.exit(0 if success else 1)
 